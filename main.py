@@ -1,6 +1,8 @@
+import logging
 import umaModelReplace
 
-uma = umaModelReplace.UmaReplace()
+# 在 __main__ 中初始化, 避免多进程子进程导入本模块时重复解密 meta 数据库
+uma: umaModelReplace.UmaReplace
 
 
 def handle_texture_export_and_replace(export_func, replace_func, resource_id: str):
@@ -53,6 +55,8 @@ def replace_char_head_texture(char_id: str):
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    uma = umaModelReplace.UmaReplace()
     while True:
         do_type = input("[1] 更换头部模型\n"
                         "[2] 更换身体模型\n"
@@ -92,8 +96,9 @@ if __name__ == "__main__":
             print("请输入7位数ID, 例: 1046_01")
             inId1 = input("替换ID: ")
             inId2 = input("目标ID: ")
-            uma.replace_head(inId1, inId2)
-            uma.replace_body(inId1, inId2)
+            with uma.session():
+                uma.replace_head(inId1, inId2)
+                uma.replace_body(inId1, inId2)
             print("替换完成")
 
         if do_type == "5":
@@ -1,5 +1,4 @@
 import umaModelReplace
-import shutil
 
 uma = umaModelReplace.UmaReplace()
 
@@ -29,7 +28,7 @@ def getAndReplaceTexture2D(bundle_hash, src_names):
             # 加密修改后的文件
             encrypted_paths = uma._encrypt_dat_bundles_batch([edited_path], [bundle_hash])
             if encrypted_paths:
-                shutil.copyfile(encrypted_paths[0], uma.get_bundle_path(bundle_hash))
+                uma._install_bundle(encrypted_paths[0], uma.get_bundle_path(bundle_hash))
                 print("贴图已修改")
                 uma._cleanup_temp_dirs()
             else:
@@ -1,3 +1,20 @@
+import functools
+
+
+def _cached_paths(func):
+    """
+    缓存路径列表, 每次调用返回新的 list, 避免调用方修改缓存内容
+    """
+    cached = functools.lru_cache(maxsize=256)(lambda _id: tuple(func(_id)))
+
+    @functools.wraps(func)
+    def wrapper(_id):
+        return list(cached(_id))
+
+    return wrapper
+
+
+@_cached_paths
 def get_body_mtl_names(_id):
     return [
         f"tex_bdy{_id}_shad_c",
@@ -7,10 +24,12 @@ def get_body_mtl_names(_id):
     ]
 
 
+@functools.lru_cache(maxsize=256)
 def get_body_mtl_path(_id):
     return f"sourceresources/3d/chara/body/bdy{_id}/materials/mtl_bdy{_id}"
 
 
+@_cached_paths
 def get_body_path(_id):
     return [
         f"3d/chara/body/bdy{_id}/pfb_bdy{_id}",
@@ -20,6 +39,7 @@ def get_body_path(_id):
     ]
 
 
+@_cached_paths
 def get_head_path(_id):
     return [
         f"3d/chara/head/chr{_id}/pfb_chr{_id}",
@@ -36,6 +56,7 @@ def get_head_path(_id):
     ]
 
 
+@_cached_paths
 def get_headalpha_path(_id):
     return [
         f"sourceresources/3d/chara/head/chr{_id}/materials/mtl_chr{_id}_hair_alpha0",
@@ -43,6 +64,7 @@ def get_headalpha_path(_id):
     ]
 
 
+@_cached_paths
 def get_headphy_path(_id):
     return [
         f"3d/chara/head/chr{_id}/clothes/pfb_chr{_id}_cloth00",
@@ -53,6 +75,7 @@ def get_headphy_path(_id):
     ]
 
 
+@_cached_paths
 def get_bodyphy_path(_id):
     return [
         f"3d/chara/body/bdy{_id}/clothes/ast_bdy{_id}_skirt00",
@@ -71,6 +94,7 @@ def get_bodyphy_path(_id):
     ]
 
 
+@_cached_paths
 def get_bodyalpha_path(_id):
     return [
         f"sourceresources/3d/chara/body/bdy{_id}/materials/mtl_bdy{_id}_alpha0",
@@ -78,6 +102,7 @@ def get_bodyalpha_path(_id):
     ]
 
 
+@_cached_paths
 def get_tail1_path(_id):
     return [
         f"3d/chara/tail/tail0001_00/textures/tex_tail0001_00_{_id[:4]}_diff",
@@ -87,6 +112,7 @@ def get_tail1_path(_id):
     ]
 
 
+@_cached_paths
 def get_tail2_path(_id):
     return [
         f"3d/chara/tail/tail0002_00/textures/tex_tail0002_00_{_id[:4]}_diff",
@@ -96,18 +122,22 @@ def get_tail2_path(_id):
     ]
 
 
+@functools.lru_cache(maxsize=256)
 def get_gac_chr_start_path(type):
     return f"cutt/cutin/skill/gac_chr_start_{type}/gac_chr_start_{type}"
 
 
+@functools.lru_cache(maxsize=256)
 def get_cutin_skill_path(_id):
     return f"cutt/cutin/skill/crd{_id}_001/crd{_id}_001"
 
 
+@_cached_paths
 def get_race_result_path(_id):
     return get_chr_race_result_path(_id) + get_crd_race_result_path(_id)
 
 
+@_cached_paths
 def get_chr_race_result_path(_id):
     return [
         f"cutt/cutin/raceresult/res_chr{_id[:4]}_001/res_chr{_id[:4]}_001",
@@ -120,6 +150,7 @@ def get_chr_race_result_path(_id):
     ]
 
 
+@_cached_paths
 def get_crd_race_result_path(_id):
     return [
         f"cutt/cutin/raceresult/res_crd{_id}_001/res_crd{_id}_001",
@@ -134,6 +165,7 @@ def get_crd_race_result_path(_id):
     ]
 
 
+@_cached_paths
 def get_head_mtl_path(_id):
     return [
         f"sourceresources/3d/chara/head/chr{_id}/materials/mtl_chr{_id}_face",
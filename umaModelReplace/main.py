@@ -1,19 +1,41 @@
 import UnityPy
 import sqlite3
 import os
+import mmap
+import json
+import uuid
+import threading
+import queue
 import shutil
+import itertools
+import logging
+import collections
+import functools
+import copy
 import typing as t
 import subprocess
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 from PIL import Image
+from UnityPy.enums import ClassIDType
 from . import assets_path
 
+log = logging.getLogger(__name__)
+
 spath = os.path.split(__file__)[0]
 BACKUP_PATH = f"{spath}/backup"
 EDITED_PATH = f"{spath}/edited"
 DECRYPTED_DAT_PATH = f"{spath}/dat_decrypted"
 ENCRYPTED_DAT_PATH = f"{spath}/dat_encrypted"
 DECRYPTED_DB_PATH = f"{spath}/meta_decrypted"
+# 流水线处理时每块包含的 bundle 数量
+PIPELINE_CHUNK_SIZE = 8
+# 解密缓存最多保留的 bundle 数量
+DECRYPT_CACHE_SIZE = 128
+# 已解码 PNG 缓存的总字节数上限 (每张 2048x2048 RGBA 约 16 MB)
+PNG_CACHE_BYTES = 128 << 20
+# 已编码纹理缓存的总字节数上限
+ENCODED_TEXTURE_CACHE_BYTES = 128 << 20
 
 
 # UmaDecryptor.exe 的路径 - 从 umaModelReplace 文件夹获取
@@ -45,46 +67,499 @@ class UmaFileNotFoundError(FileNotFoundError):
     pass
 
 
-def replace_raw(data: bytes, old: bytes, new: bytes, context: int = 20) -> bytes:
+def replace_raw(data: bytes, old: bytes, new: bytes) -> t.Tuple[bytes, bool]:
     """
-    在 data 中将所有 old 替换为 new，并在每次替换时打印上下文。
+    在 data 中将所有 old 替换为 new
 
     :param data: 原始字节串
     :param old: 需要被替换的字节串
     :param new: 替换成的字节串
-    :param context: 打印时，替换位置前后各保留多少字节上下文
-    :return: 完成所有替换后的新字节串
+    :return: (完成所有替换后的新字节串, 是否发生了替换)
+    """
+    # 查找与替换均交给 bytes 的 C 实现完成, 避免逐段拼接
+    if old not in data:
+        return data, False
+    return data.replace(old, new), True
+
+
+def _big_copy(src: str, dst: str, buffer_size: int = 1 << 20):
+    """
+    使用较大的缓冲区复制文件, 减少复制大体积 bundle 时的系统调用次数
+    """
+    buf = bytearray(buffer_size)
+    view = memoryview(buf)
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            fdst.write(view[:n])
+
+
+def _fastcopy(src: str, dst: str):
+    """
+    在内核中复制文件 (copy_file_range, 支持的文件系统上可以直接 reflink), 不可用时退回到 _big_copy
+    """
+    copy_file_range = getattr(os, "copy_file_range", None)
+    if copy_file_range is not None:
+        try:
+            with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    n = copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if n == 0:
+                        break
+                    remaining -= n
+                if remaining == 0:
+                    return
+        except OSError:
+            pass
+    _big_copy(src, dst)
+
+
+def _stage(src: str, dst: str):
+    """
+    将文件放置到临时目录: 同一文件系统下使用硬链接, 否则退回到复制
+    """
+    try:
+        os.link(src, dst)
+    except OSError:
+        _fastcopy(src, dst)
+
+
+def _pid_alive(pid: int) -> bool:
+    """
+    判断进程是否仍在运行
+    Windows 上 os.kill 会直接结束目标进程, 因此改用 OpenProcess 查询
+    """
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        import ctypes
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.OpenProcess.restype = ctypes.c_void_p
+        kernel32.GetExitCodeProcess.argtypes = (ctypes.c_void_p, ctypes.POINTER(ctypes.c_ulong))
+        kernel32.CloseHandle.argtypes = (ctypes.c_void_p,)
+        # PROCESS_QUERY_LIMITED_INFORMATION
+        handle = kernel32.OpenProcess(0x1000, False, pid)
+        if not handle:
+            # ERROR_ACCESS_DENIED: 进程存在但无权访问
+            return ctypes.get_last_error() == 5
+        try:
+            exit_code = ctypes.c_ulong()
+            if not kernel32.GetExitCodeProcess(handle, ctypes.byref(exit_code)):
+                return True
+            # STILL_ACTIVE
+            return exit_code.value == 259
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _save_env_file(env, path: str):
+    """
+    将 UnityPy 加载并修改后的 bundle 保存到 path
+    UnityPy 的 save() 只能返回完整的字节串, 这里写出后立即释放, 不在调用方保留额外引用
+    文件以无缓冲方式打开, 字节串直接交给系统调用写出, 不经过 Python 的写缓冲
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    data = env.file.save()
+    with open(path, "wb", buffering=0) as f:
+        view = memoryview(data)
+        # 无缓冲写入可能只写出一部分
+        while view:
+            view = view[f.write(view):]
+        view.release()
+    del data
+
+
+def _save_png(img: Image.Image, path: str):
+    """
+    保存导出的纹理 PNG, 使用低压缩级别以加快编码 (文件略大)
+    """
+    img.save(path, optimize=False, compress_level=1)
+
+
+def _wait_png_saves(futures: t.Dict["Future", str]):
+    """
+    等待 PNG 保存任务完成并输出结果
+    :param futures: {保存任务: 纹理名}
+    """
+    for future in as_completed(futures):
+        texture_name = futures[future]
+        try:
+            future.result()
+            print(f"✅ Exported: {texture_name}")
+        except Exception as e:
+            print(f"❌ Failed to save image {texture_name}: {e}")
+
+
+def _available_pngs(directory: str) -> t.Dict[str, str]:
+    """
+    一次读取目录, 代替逐个纹理 stat
+    与 Windows 上的 os.path.isfile 一致, 纹理名与扩展名均不区分大小写 (如 Tex_Chr1001.PNG)
+    目录不存在时返回空字典
+    :return: {os.path.normcase(纹理名): PNG 路径}
+    """
+    try:
+        with os.scandir(directory) as entries:
+            return {os.path.normcase(entry.name[:-4]): f"{directory}/{entry.name}" for entry in entries
+                    if entry.name[-4:].lower() == ".png" and entry.is_file()}
+    except FileNotFoundError:
+        return {}
+
+
+def _objects_of_type(env, class_id: ClassIDType) -> list:
+    """
+    一次遍历取出 env 中指定类型的对象
+    按枚举比较 obj.type, 不在每个对象上访问 type.name 做字符串比较
+    """
+    return [obj for obj in env.objects if obj.type is class_id]
+
+
+# dress_data 的列顺序, 解锁 Live 服装时按此顺序插入
+_DRESS_COLUMNS = (
+    "id", "condition_type", "have_mini", "general_purpose", "costume_type", "chara_id", "use_gender",
+    "body_shape", "body_type", "body_type_sub", "body_setting", "use_race", "use_live", "use_live_theater",
+    "use_home", "use_dress_change", "is_wet", "is_dirt", "head_sub_id", "use_season", "dress_color_main",
+    "dress_color_sub", "color_num", "disp_order", "tail_model_id", "tail_model_sub_id",
+    "mini_mayu_shader_type", "start_time", "end_time"
+)
+_INSERT_DRESS_SQL = (f"INSERT INTO dress_data ({', '.join(_DRESS_COLUMNS)}) "
+                     f"VALUES ({', '.join('?' * len(_DRESS_COLUMNS))})")
+
+
+def _peek_object_name(obj) -> t.Optional[str]:
+    """
+    只读取对象的 m_Name, 不解码整个对象 (Texture2D 的像素数据可能有数 MB)
+    NamedObject 的序列化数据以 m_Name 开头, 直接从对象起始位置读取一个对齐字符串
+    :param obj: UnityPy 的 ObjectReader
+    :return: 对象名, 无法读取时返回 None
+    """
+    peek_name = getattr(obj, "peek_name", None)
+    if peek_name is not None:
+        return peek_name()
+    try:
+        obj.reset()
+        return obj.reader.read_aligned_string()
+    except Exception:
+        data = obj.read()
+        return getattr(data, "m_Name", None)
+
+
+# 清除 Live 模糊时写入第一个景深关键帧的数据
+# 含嵌套的 curve, 写入时需深拷贝, 避免多个 typetree 共用 (并可能修改) 同一个对象
+_DOF_SET_DATA = {
+    "frame": 0,
+    "attribute": 327680,
+    "interpolateType": 0,
+    "curve": {
+        "m_Curve": [],
+        "m_PreInfinity": 2,
+        "m_PostInfinity": 2,
+        "m_RotationOrder": 4
+    },
+    "easingType": 0,
+    "forcalSize": 30.0,
+    "blurSpread": 20.0,
+    "charactor": 1,
+    "dofBlurType": 3,
+    "dofQuality": 1,
+    "dofForegroundSize": 0.0,
+    "dofFgBlurSpread": 1.0,
+    "dofFocalPoint": 1.0,
+    "dofSmoothness": 1.0,
+    "BallBlurPowerFactor": 0.0,
+    "BallBlurBrightnessThreshhold": 0.0,
+    "BallBlurBrightnessIntensity": 1.0,
+    "BallBlurSpread": 0.0
+}
+
+
+def _edit_one_camera_bundle(decrypted_path: str, bundle_hash: str, edited_root: str) -> t.Optional[str]:
+    """
+    清除单个 Live 镜头 bundle 中的模糊效果 (可在子进程中执行)
+    :param decrypted_path: 解密后的文件路径
+    :param bundle_hash: bundle 的 hash
+    :param edited_root: 修改后文件的保存目录
+    :return: 修改后的文件路径, 失败时返回 None
+    """
+    try:
+        env = UnityPy.load(decrypted_path)
+        for obj in _objects_of_type(env, ClassIDType.MonoBehaviour):
+            if not obj.serialized_type.nodes:
+                continue
+            tree = obj.read_typetree()
+
+            dof_keys = tree['postEffectDOFKeys']
+            first = dof_keys['thisList'][0]
+            first.update(copy.deepcopy(_DOF_SET_DATA))
+            dof_keys['thisList'] = [first]
+
+            tree['postEffectBloomDiffusionKeys']['thisList'] = []
+            tree['radialBlurKeys']['thisList'] = []
+
+            obj.save_typetree(tree)
+
+        # 保存修改后的文件
+        edited_file = f"{edited_root}/{bundle_hash}"
+        _save_env_file(env, edited_file)
+        return edited_file
+
+    except Exception as e:
+        print(f"❌ Exception occurred when editing file: {bundle_hash}\n{e}")
+        # 批量处理时可能大量失败, 堆栈只在调试日志中输出
+        log.debug("Editing %s failed", bundle_hash, exc_info=True)
+        return None
+
+
+class _ByteLRUCache:
+    """
+    按总字节数限制大小的 LRU 缓存 (线程安全)
+    单个值超过上限时不缓存
+    """
+
+    def __init__(self, max_bytes: int, sizeof: t.Callable[[t.Any], int]):
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._items: "collections.OrderedDict[t.Hashable, t.Tuple[t.Any, int]]" = collections.OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            self._items.move_to_end(key)
+            return item[0]
+
+    def put(self, key, value):
+        size = self._sizeof(value)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._items.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+
+# 已解码 PNG 缓存 {(路径, 修改时间, 大小): 图片}, 文件变化后自动失效
+_PNG_CACHE = _ByteLRUCache(PNG_CACHE_BYTES, lambda image: image.width * image.height * len(image.getbands()))
+
+
+def _load_png(path: str) -> Image.Image:
+    """
+    解码 PNG
+    调色板/灰度等模式统一转换为 RGBA, 避免每次写入纹理时由 UnityPy 重复转换
+    """
+    image = Image.open(path)
+    image.load()
+    if image.mode not in ("RGBA", "RGB"):
+        image = image.convert("RGBA")
+    return image
+
+
+def _open_png(path: str) -> Image.Image:
+    """
+    打开并解码 PNG (可在线程中执行), 同一文件在多次替换之间只解码一次
+    UnityPy 编码纹理时先翻转/转换得到新图片, 不会修改传入的图片, 因此直接返回缓存对象, 不再复制像素
+    :return: 缓存的图片
+    """
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    image = _PNG_CACHE.get(key)
+    if image is None:
+        image = _load_png(path)
+        _PNG_CACHE.put(key, image)
+    return image
+
+
+# 已编码纹理缓存 {(PNG 路径, 修改时间, 大小, 原纹理格式, 原宽, 原高): {Texture2D 字段名: 编码后的值}}
+_ENCODED_TEXTURE_CACHE = _ByteLRUCache(ENCODED_TEXTURE_CACHE_BYTES, lambda encoded: len(encoded["image_data"]))
+# set_image 会写入的字段, 命中缓存时按此写回
+_ENCODED_TEXTURE_FIELDS = ("m_TextureFormat", "m_Width", "m_Height", "m_CompleteImageSize", "m_MipCount")
+
+
+def _reset_stream_data(data):
+    """
+    清掉 Texture2D 对外部 .resS 数据的引用, 让像素数据随对象本身写入
+    """
+    if hasattr(data, "reset_streamdata"):
+        data.reset_streamdata()
+        return
+    stream = getattr(data, "m_StreamData", None)
+    if stream is not None:
+        stream.offset = 0
+        stream.size = 0
+        stream.path = ""
+
+
+def _set_texture_png(data, file_path: str, image: t.Optional[Image.Image] = None):
+    """
+    用 PNG 替换 Texture2D 的图像
+    压缩格式 (ASTC/ETC/DXT) 的编码开销远大于解码, 未修改的 PNG 再次写入同格式纹理时复用上次的编码结果
+    :param data: obj.read() 得到的 Texture2D
+    :param file_path: PNG 路径
+    :param image: 已解码的图片, 为 None 且未命中缓存时在此解码
+    """
+    st = os.stat(file_path)
+    key = (file_path, st.st_mtime_ns, st.st_size, int(data.m_TextureFormat), data.m_Width, data.m_Height)
+    encoded = _ENCODED_TEXTURE_CACHE.get(key)
+    if encoded is not None:
+        # 与 set_image 一致: 先清掉外部 .resS 引用, 再经 image_data 属性写入像素数据,
+        # 否则 m_StreamData.path 非空的纹理保存时仍会指向原来的外部数据
+        _reset_stream_data(data)
+        data.image_data = encoded["image_data"]
+        for name in _ENCODED_TEXTURE_FIELDS:
+            if name in encoded:
+                setattr(data, name, encoded[name])
+        return
+
+    data.image = image if image is not None else _open_png(file_path)
+    # 转成不可变的 bytes, 多个 Texture2D 共用同一份编码结果时互不影响
+    encoded = {"image_data": bytes(data.image_data)}
+    for name in _ENCODED_TEXTURE_FIELDS:
+        if hasattr(data, name):
+            encoded[name] = getattr(data, name)
+    _ENCODED_TEXTURE_CACHE.put(key, encoded)
+
+
+def clear_image_caches():
+    """
+    释放已解码 PNG 与已编码纹理的缓存
+    """
+    _PNG_CACHE.clear()
+    _ENCODED_TEXTURE_CACHE.clear()
+
+
+def _submit_png_decodes(pool: ThreadPoolExecutor, paths: t.List[str]) -> t.Dict[str, "Future[Image.Image]"]:
+    """
+    在 pool 中按顺序提交 PNG 解码, 与纹理对象的读取/编码重叠
+    :param pool: 解码使用的线程池, 其线程数决定同时解码的图片数量
+    :param paths: PNG 路径列表, 重复的路径只解码一次
+    :return: {PNG 路径: Future}, result() 返回图片, 解码失败时抛出异常
+    """
+    return {path: pool.submit(_open_png, path) for path in dict.fromkeys(paths)}
+
+
+def _replace_ids_worker(decrypted_path: str, bundle_hash: str, id_from: str, id_to: str,
+                        edited_root: str) -> t.Optional[str]:
+    """
+    替换单个 bundle 中的 ID 并保存到 edited_root (可在子进程中执行)
+    :param decrypted_path: 解密后的文件路径
+    :param bundle_hash: 修改后文件对应的 bundle hash
+    :param id_from: 被替换的 ID
+    :param id_to: 替换后的 ID
+    :param edited_root: 修改后文件的保存目录
+    :return: 修改后的文件路径, 失败时返回 None
+    """
+    try:
+        return UmaReplace.replace_file_path(decrypted_path, id_from, id_to, f"{edited_root}/{bundle_hash}")
+    except Exception as e:
+        print(f"❌ Exception occurred when editing file: {bundle_hash}\n{e}")
+        # 批量处理时可能大量失败, 堆栈只在调试日志中输出
+        log.debug("Editing %s failed", bundle_hash, exc_info=True)
+        return None
+
+
+def _export_head_bundle_worker(decrypted_path: str, export_dir: str) -> bool:
+    """
+    导出单个头部 bundle 中的所有纹理为 PNG (可在线程中执行)
+    :param decrypted_path: 解密后的文件路径
+    :param export_dir: 导出目录
+    :return: 是否处理成功
     """
+    try:
+        env = UnityPy.load(decrypted_path)
+        # PNG 编码在后台线程进行, 同时继续读取下一个纹理
+        with ThreadPoolExecutor(max_workers=min(6, os.cpu_count() or 1)) as pool:
+            futures = {}
+            for obj in _objects_of_type(env, ClassIDType.Texture2D):
+                # 单个纹理出错时继续导出其余纹理
+                try:
+                    texture_name = _peek_object_name(obj)
+                    data = obj.read()
+                    # 导出纹理为PNG
+                    img_path = f"{export_dir}/{texture_name}.png"
+                    futures[pool.submit(_save_png, data.image, img_path)] = texture_name
+                except Exception as e:
+                    print(f"❌ Error reading texture object: {e}")
+            _wait_png_saves(futures)
+        return True
+    except Exception as e:
+        print(f"⚠️  Error processing bundle {os.path.basename(decrypted_path)}: {e}")
+        return False
 
-    any_replaced = False
-    result = bytearray()
-    i = 0
-    while True:
-        idx = data.find(old, i)
-        if idx < 0:
-            # 无更多匹配，添加剩余部分
-            result.extend(data[i:])
-            break
-        any_replaced = True
-        # 计算上下文的起止位置
-        start = max(idx - context, 0)
-        end = min(idx + len(old) + context, len(data))
-
-        before = data[start:idx]
-        match = data[idx:idx + len(old)]
-        after = data[idx + len(old):end]
-
-        # 打印信息
-        # print(f"Match at byte offset {idx}:")
-        # print(f"  …{before!r}[{match!r}]{after!r}…")
-
-        # 构造结果
-        result.extend(data[i:idx])
-        result.extend(new)
-        i = idx + len(old)
-
-    # result=result.replace("chr1024_00/textures/tex_chr1024_00_cheek0".encode("utf8"), "chr9002_00/textures/tex_chr9002_00_cheek0".encode("utf8"))
-    return bytes(result), any_replaced
+
+def _replace_head_bundle_worker(decrypted_path: str, bundle_hash: str, export_dir: str,
+                                edited_root: str, available: t.Optional[t.Dict[str, str]] = None) -> t.Optional[str]:
+    """
+    用本地修改后的 PNG 替换单个头部 bundle 中的纹理 (可在线程中执行)
+    :param decrypted_path: 解密后的文件路径
+    :param bundle_hash: bundle 的 hash
+    :param export_dir: 纹理 PNG 所在目录
+    :param edited_root: 修改后文件的保存目录
+    :param available: export_dir 中已有的 PNG (_available_pngs 的结果), 为 None 时在此读取目录
+    :return: 修改后的文件路径, 失败时返回 None
+    """
+    try:
+        if available is None:
+            available = _available_pngs(export_dir)
+        env = UnityPy.load(decrypted_path)
+        textures_updated = 0
+
+        # 先只读名字, 没有对应 PNG 的纹理不做完整解码
+        targets = []
+        for obj in _objects_of_type(env, ClassIDType.Texture2D):
+            texture_name = _peek_object_name(obj)
+            file_path = available.get(os.path.normcase(texture_name or ""))
+            if file_path is not None:
+                targets.append((obj, texture_name, file_path))
+
+        # 后台线程预先解码 PNG, 与当前纹理的编码/写入重叠
+        with ThreadPoolExecutor(max_workers=2) as decoder:
+            decoded = _submit_png_decodes(decoder, [file_path for _, _, file_path in targets])
+            for obj, texture_name, file_path in targets:
+                try:
+                    # 加载修改后的纹理
+                    data = obj.read()
+                    _set_texture_png(data, file_path, decoded[file_path].result())
+                    data.save()
+                    textures_updated += 1
+                    print(f"✅ Updated texture: {texture_name}")
+                except Exception as e:
+                    print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
+
+        if textures_updated == 0:
+            print(f"⚠️  No textures updated in bundle {bundle_hash}")
+
+        edited_file = f"{edited_root}/{bundle_hash}"
+        _save_env_file(env, edited_file)
+        return edited_file
+
+    except Exception as e:
+        print(f"⚠️  Error processing texture bundle {bundle_hash}: {type(e).__name__}: {e}")
+        log.debug("Processing texture bundle %s failed", bundle_hash, exc_info=True)
+        return None
 
 
 class UmaReplace:
@@ -92,11 +567,61 @@ class UmaReplace:
         self.init_folders()
         profile_path = os.environ.get("UserProfile")
         self.base_path = f"{profile_path}/AppData/LocalLow/Cygames/umamusume"
+        self._cleanup_stale_stages()
 
         # 先解密 meta 数据库，再连接解密后的数据库
         self._decrypt_meta_db()
         self.conn = sqlite3.connect(f"{DECRYPTED_DB_PATH}/meta")
+        self.conn.row_factory = sqlite3.Row
+        self._tune_sqlite(self.conn)
+        # 为资源路径建立索引, 加快按路径查询 hash
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_a_n ON a(n)")
+        # 用于查询 pfb_chr1____90 (Live 服装专用头部) 的表达式索引, 避免前置通配符导致全表扫描
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_a_n_pfb ON a(substr(n, -14, 8))")
+        self.conn.commit()
+        # 索引建立后 meta 数据库只用于查询
+        self.conn.execute("PRAGMA query_only=1")
+        # master.mdb 由游戏读取, 保持 SQLite 默认设置
         self.master_conn = sqlite3.connect(f"{self.base_path}/master/master.mdb")
+        # 复用同一个游标进行 hash 查询
+        self._cur = self.conn.cursor()
+        self._session: t.Optional[ReplaceSession] = None
+        self._pfb_chr1_unique_cache: t.Optional[t.List[str]] = None
+        # bundle hash 查询缓存 {(资源路径, 原始 ID): bundle hash}
+        self._hash_cache: t.Dict[t.Tuple[str, t.Optional[str]], str] = {}
+        # 后台删除临时目录
+        self._gc = ThreadPoolExecutor(max_workers=1)
+        # 解密缓存 {bundle hash: [mtime_ns, size]}, 按最近使用顺序排列
+        self._decrypt_cache = collections.OrderedDict(self._load_decrypt_manifest())
+        # 流水线中已解密但尚未修改完的 hash 及其引用次数, 淘汰缓存时跳过
+        self._decrypt_pinned: "collections.Counter[str]" = collections.Counter()
+        self._decrypt_pinned_lock = threading.Lock()
+
+    @staticmethod
+    def _tune_sqlite(conn: sqlite3.Connection):
+        """
+        调整 SQLite 连接参数: WAL 日志, 减少同步落盘, 增大页缓存, 临时表放内存, 使用 mmap 读取
+        只用于解密出的 meta 数据库副本
+        :param conn: 数据库连接
+        """
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA cache_size=-65536")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute("PRAGMA mmap_size=268435456")
+
+    def close(self):
+        """
+        等待后台清理任务完成, 并释放图片缓存
+        """
+        gc = getattr(self, "_gc", None)
+        if gc is not None:
+            # 等待后台清理完成
+            gc.shutdown(wait=True)
+        clear_image_caches()
+
+    def __del__(self):
+        self.close()
 
     def _run_decryptor(self, args: list) -> bool:
         """
@@ -135,15 +660,50 @@ class UmaReplace:
         if not os.path.isfile(meta_path):
             raise UmaFileNotFoundError(f"meta database not found at {meta_path}")
 
-        # 清理旧的解密文件
-        if os.path.isdir(DECRYPTED_DB_PATH):
-            shutil.rmtree(DECRYPTED_DB_PATH)
+        # 记录解密时源文件的大小与修改时间, 两者都一致时直接复用
+        decrypted_path = f"{DECRYPTED_DB_PATH}/meta"
+        source_path = f"{DECRYPTED_DB_PATH}/meta.source.json"
+        st = os.stat(meta_path)
+        source = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+        try:
+            with open(source_path, "r", encoding="utf8") as f:
+                cached_source = json.load(f)
+            if cached_source == source and os.path.isfile(decrypted_path):
+                print("Using cached decrypted meta database")
+                return
+        except (OSError, ValueError):
+            pass
+
         os.makedirs(DECRYPTED_DB_PATH, exist_ok=True)
+        # 先作废旧记录, 解密中断时下次不会误用不完整的文件
+        try:
+            os.remove(source_path)
+        except OSError:
+            pass
 
         print(f"Decrypting meta database...")
-        success = self._run_decryptor(["decrypt-db", "-i", meta_path, "-o", f"{DECRYPTED_DB_PATH}/meta"])
-        if not success:
-            raise RuntimeError("Failed to decrypt meta database")
+        # 解密到临时文件, 完成后再替换, 保证 meta 要么是旧的完整文件, 要么是新的完整文件
+        temp_path = f"{decrypted_path}.{uuid.uuid4().hex}.tmp"
+        try:
+            success = self._run_decryptor(["decrypt-db", "-i", meta_path, "-o", temp_path])
+            if not success or not os.path.isfile(temp_path):
+                raise RuntimeError("Failed to decrypt meta database")
+            # 旧数据库的 WAL 文件不能套用到新数据库上
+            for suffix in ("-wal", "-shm"):
+                try:
+                    os.remove(decrypted_path + suffix)
+                except OSError:
+                    pass
+            os.replace(temp_path, decrypted_path)
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+        with open(f"{source_path}.tmp", "w", encoding="utf8") as f:
+            json.dump(source, f)
+        os.replace(f"{source_path}.tmp", source_path)
         print("Meta database decrypted successfully")
 
     def _decrypt_dat_bundle(self, bundle_hash: str) -> str:
@@ -174,81 +734,145 @@ class UmaReplace:
         :param bundle_hashes: bundle hash 列表
         :return: 解密后的文件路径列表
         """
-        if not bundle_hashes:
-            return []
+        decrypted = self._decrypt_dat_bundles_map(bundle_hashes)
+        return [decrypted[bundle_hash] for bundle_hash in bundle_hashes if bundle_hash in decrypted]
 
-        # 清理旧的解密目录 - 重试机制处理文件被占用的情况
-        if os.path.isdir(DECRYPTED_DAT_PATH):
-            try:
-                shutil.rmtree(DECRYPTED_DAT_PATH)
-            except PermissionError:
-                # 文件被占用，等待后重试
-                import time
-                print("⚠️  Waiting for files to be released...")
-                time.sleep(1)
-                try:
-                    shutil.rmtree(DECRYPTED_DAT_PATH)
-                except PermissionError:
-                    print("⚠️  Force removing locked directory...")
-                    import time
-                    time.sleep(2)
-                    try:
-                        shutil.rmtree(DECRYPTED_DAT_PATH)
-                    except:
-                        # 如果still无法删除，忽略错误继续
-                        pass
+    def _decrypt_dat_bundles_map(self, bundle_hashes: list) -> t.Dict[str, str]:
+        """
+        批量解密多个 dat 文件, 重复的 hash 只解密一次
+        :param bundle_hashes: bundle hash 列表
+        :return: {bundle hash: 解密后的文件路径}
+        """
+        bundle_hashes = list(dict.fromkeys(bundle_hashes))
+        if not bundle_hashes:
+            return {}
 
+        # 解密结果按 (mtime, size) 缓存, 只有源文件变化过的 bundle 才需要重新解密
         os.makedirs(DECRYPTED_DAT_PATH, exist_ok=True)
+        manifest = self._decrypt_cache
+        stale_hashes = []
+        for bundle_hash in bundle_hashes:
+            signature = self._bundle_signature(bundle_hash)
+            decrypted_path = f"{DECRYPTED_DAT_PATH}/dat/{bundle_hash[:2]}/{bundle_hash}"
+            if signature is None or manifest.get(bundle_hash) != signature or not os.path.isfile(decrypted_path):
+                stale_hashes.append(bundle_hash)
+            elif bundle_hash in manifest:
+                manifest.move_to_end(bundle_hash)
 
-        # 清理旧的临时加密目录
-        if os.path.isdir(ENCRYPTED_DAT_PATH):
-            try:
-                shutil.rmtree(ENCRYPTED_DAT_PATH)
-            except PermissionError:
-                import time
-                time.sleep(1)
-                try:
-                    shutil.rmtree(ENCRYPTED_DAT_PATH)
-                except:
-                    pass
+        # 每次解密使用独立的暂存目录, 无需等待删除上一次 (可能仍被占用) 的暂存文件
+        run_dir = f"{ENCRYPTED_DAT_PATH}/run_{uuid.uuid4().hex}"
 
         # 将所有需要解密的文件复制到临时目录
-        print(f"Copying {len(bundle_hashes)} files to temporary directory...")
-        for bundle_hash in bundle_hashes:
+        def _copy_one(bundle_hash: str) -> bool:
             original_path = self.get_bundle_path(bundle_hash)
             if not os.path.isfile(original_path):
                 print(f"⚠️  File not found: {original_path}")
-                continue
+                return False
 
-            temp_encrypted_dir = f"{ENCRYPTED_DAT_PATH}/dat/{bundle_hash[:2]}"
+            temp_encrypted_dir = f"{run_dir}/dat/{bundle_hash[:2]}"
             os.makedirs(temp_encrypted_dir, exist_ok=True)
             temp_file = f"{temp_encrypted_dir}/{bundle_hash}"
-            shutil.copyfile(original_path, temp_file)
+            _stage(original_path, temp_file)
+            return True
 
-        # 一次性执行解密
-        print(f"Decrypting {len(bundle_hashes)} bundles...")
-        success = self._run_decryptor([
-            "decrypt-dat",
-            "-i", ENCRYPTED_DAT_PATH,
-            "-o", DECRYPTED_DAT_PATH,
-            "-m", f"{DECRYPTED_DB_PATH}/meta"
-        ])
+        if stale_hashes:
+            try:
+                print(f"Copying {len(stale_hashes)} files to temporary directory...")
+                with ThreadPoolExecutor(max_workers=min(32, len(stale_hashes))) as executor:
+                    list(executor.map(_copy_one, stale_hashes))
+
+                # 一次性执行解密
+                print(f"Decrypting {len(stale_hashes)} bundles...")
+                success = self._run_decryptor([
+                    "decrypt-dat",
+                    "-i", run_dir,
+                    "-o", DECRYPTED_DAT_PATH,
+                    "-m", f"{DECRYPTED_DB_PATH}/meta"
+                ])
+
+                if not success:
+                    raise RuntimeError(f"Failed to decrypt bundles")
+
+                for bundle_hash in stale_hashes:
+                    signature = self._bundle_signature(bundle_hash)
+                    if signature is not None:
+                        manifest[bundle_hash] = signature
+                        manifest.move_to_end(bundle_hash)
+                self._evict_decrypt_cache(keep=bundle_hashes)
+                self._save_decrypt_manifest(manifest)
+            finally:
+                # 暂存文件解密后即可删除
+                shutil.rmtree(run_dir, ignore_errors=True)
 
-        if not success:
-            raise RuntimeError(f"Failed to decrypt bundles")
+        if len(stale_hashes) < len(bundle_hashes):
+            print(f"Reusing {len(bundle_hashes) - len(stale_hashes)} cached decrypted bundles")
 
         # 验证并返回解密后的文件路径
-        decrypted_paths = []
+        decrypted_paths = {}
         for bundle_hash in bundle_hashes:
             decrypted_path = f"{DECRYPTED_DAT_PATH}/dat/{bundle_hash[:2]}/{bundle_hash}"
             if os.path.isfile(decrypted_path):
-                decrypted_paths.append(decrypted_path)
+                decrypted_paths[bundle_hash] = decrypted_path
             else:
                 print(f"⚠️  Decrypted file not found: {decrypted_path}")
 
         print(f"Successfully decrypted {len(decrypted_paths)} files")
         return decrypted_paths
 
+    def _bundle_signature(self, bundle_hash: str) -> t.Optional[t.List[int]]:
+        """
+        游戏目录中 bundle 文件的 [mtime_ns, size], 文件不存在时返回 None
+        """
+        try:
+            st = os.stat(self.get_bundle_path(bundle_hash))
+        except OSError:
+            return None
+        return [st.st_mtime_ns, st.st_size]
+
+    def _evict_decrypt_cache(self, keep: t.List[str]):
+        """
+        解密缓存超过 DECRYPT_CACHE_SIZE 时删除最久未使用的解密文件
+        :param keep: 本次需要使用, 不能被删除的 hash
+        """
+        with self._decrypt_pinned_lock:
+            keep = set(keep) | set(self._decrypt_pinned)
+        for bundle_hash in list(self._decrypt_cache):
+            if len(self._decrypt_cache) <= DECRYPT_CACHE_SIZE:
+                break
+            if bundle_hash in keep:
+                continue
+            del self._decrypt_cache[bundle_hash]
+            try:
+                os.remove(f"{DECRYPTED_DAT_PATH}/dat/{bundle_hash[:2]}/{bundle_hash}")
+            except OSError:
+                pass
+
+    def _pin_decrypted(self, bundle_hashes: t.Iterable[str]):
+        """
+        标记解密文件正在使用, 在 _unpin_decrypted 之前不会被 _evict_decrypt_cache 删除
+        """
+        with self._decrypt_pinned_lock:
+            self._decrypt_pinned.update(bundle_hashes)
+
+    def _unpin_decrypted(self, bundle_hashes: t.Iterable[str]):
+        with self._decrypt_pinned_lock:
+            self._decrypt_pinned.subtract(bundle_hashes)
+            self._decrypt_pinned += collections.Counter()
+
+    @staticmethod
+    def _load_decrypt_manifest() -> t.Dict[str, t.List[int]]:
+        manifest_path = f"{DECRYPTED_DAT_PATH}/.manifest.json"
+        try:
+            with open(manifest_path, "r", encoding="utf8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def _save_decrypt_manifest(manifest: t.Dict[str, t.List[int]]):
+        with open(f"{DECRYPTED_DAT_PATH}/.manifest.json", "w", encoding="utf8") as f:
+            json.dump(manifest, f)
+
     def _encrypt_dat_bundle(self, decrypted_file_path: str, bundle_hash: str) -> str:
         """
         加密已解密的 dat 文件回到原始位置
@@ -292,40 +916,49 @@ class UmaReplace:
         print(f"Bundle encrypted: {encrypted_path}")
         return encrypted_path
 
-    def _encrypt_dat_bundles_batch(self, decrypted_file_paths: list, bundle_hashes: list) -> list:
+    def _encrypt_dat_bundles_batch(self, decrypted_file_paths: list, bundle_hashes: list,
+                                   install: bool = False) -> list:
         """
         批量加密多个 dat 文件
         :param decrypted_file_paths: 解密后的文件路径列表
         :param bundle_hashes: 对应的 bundle hash 列表
-        :return: 加密后的文件路径列表
+        :param install: 是否直接将加密结果放回游戏目录
+        :return: 加密后的文件路径列表 (install 为 True 时为游戏目录内的路径)
         """
         if not decrypted_file_paths:
             return []
 
+        # 同一 hash 只加密一次 (以最后出现的文件为准)
+        pending = dict(zip(bundle_hashes, decrypted_file_paths))
+
         # 清理旧的临时目录
         temp_decrypt_dir = f"{DECRYPTED_DAT_PATH}_temp"
         if os.path.isdir(temp_decrypt_dir):
             shutil.rmtree(temp_decrypt_dir)
 
-        temp_encrypted_output = f"{ENCRYPTED_DAT_PATH}_output"
+        # 直接放回游戏目录时, 输出到游戏目录所在文件系统上的暂存目录, 之后仅需重命名
+        temp_encrypted_output = self._get_stage_path() if install else f"{ENCRYPTED_DAT_PATH}_output"
         if os.path.isdir(temp_encrypted_output):
             shutil.rmtree(temp_encrypted_output)
 
         # 将所有解密后的文件（包括修改过的）复制到临时目录
-        print(f"Copying {len(decrypted_file_paths)} files for encryption...")
-        for i, decrypted_path in enumerate(decrypted_file_paths):
+        def _copy_one(decrypted_path: str, bundle_hash: str) -> bool:
             if not os.path.isfile(decrypted_path):
                 print(f"⚠️  File not found: {decrypted_path}")
-                continue
+                return False
 
-            bundle_hash = bundle_hashes[i]
             temp_decrypt_dat_dir = f"{temp_decrypt_dir}/dat/{bundle_hash[:2]}"
             os.makedirs(temp_decrypt_dat_dir, exist_ok=True)
             temp_decrypt_file = f"{temp_decrypt_dat_dir}/{bundle_hash}"
-            shutil.copyfile(decrypted_path, temp_decrypt_file)
+            _stage(decrypted_path, temp_decrypt_file)
+            return True
+
+        print(f"Copying {len(pending)} files for encryption...")
+        with ThreadPoolExecutor(max_workers=min(32, len(pending))) as executor:
+            list(executor.map(_copy_one, pending.values(), pending.keys()))
 
         # 一次性执行加密（异或处理）
-        print(f"Encrypting {len(decrypted_file_paths)} bundles...")
+        print(f"Encrypting {len(pending)} bundles...")
         success = self._run_decryptor([
             "decrypt-dat",
             "-i", temp_decrypt_dir,
@@ -337,25 +970,41 @@ class UmaReplace:
             raise RuntimeError(f"Failed to encrypt bundles")
 
         # 验证并返回加密后的文件路径
-        encrypted_paths = []
-        for bundle_hash in bundle_hashes:
+        encrypted_by_hash = {}
+        for bundle_hash in pending:
             encrypted_path = f"{temp_encrypted_output}/dat/{bundle_hash[:2]}/{bundle_hash}"
-            if os.path.isfile(encrypted_path):
-                encrypted_paths.append(encrypted_path)
-            else:
+            if not os.path.isfile(encrypted_path):
                 print(f"⚠️  Encrypted file not found: {encrypted_path}")
+                continue
+            if install:
+                os.replace(encrypted_path, self.get_bundle_path(bundle_hash))
+                encrypted_path = self.get_bundle_path(bundle_hash)
+            encrypted_by_hash[bundle_hash] = encrypted_path
 
-        print(f"Successfully encrypted {len(encrypted_paths)} files")
-        return encrypted_paths
+        print(f"Successfully encrypted {len(encrypted_by_hash)} files")
+        return [encrypted_by_hash[bundle_hash] for bundle_hash in bundle_hashes if bundle_hash in encrypted_by_hash]
 
-    def _cleanup_temp_dirs(self):
+    def _cleanup_temp_dirs(self, background: bool = False):
         """
         清理临时目录
+        :param background: 是否在后台删除. 目录先被重命名移开 (同一文件系统上只改元数据),
+                           之后的调用可以立即重新创建同名目录, 实际删除在后台线程中进行
         """
-        for temp_dir in [ENCRYPTED_DAT_PATH, f"{DECRYPTED_DAT_PATH}_temp", f"{ENCRYPTED_DAT_PATH}_output"]:
-            if os.path.isdir(temp_dir):
+        for temp_dir in [ENCRYPTED_DAT_PATH, f"{DECRYPTED_DAT_PATH}_temp", f"{ENCRYPTED_DAT_PATH}_output",
+                         self._get_stage_path()]:
+            if not os.path.isdir(temp_dir):
+                continue
+            if background:
+                trash_dir = f"{temp_dir}.trash_{uuid.uuid4().hex}"
+                try:
+                    os.rename(temp_dir, trash_dir)
+                except OSError:
+                    shutil.rmtree(temp_dir)
+                else:
+                    self._gc.submit(shutil.rmtree, trash_dir, ignore_errors=True)
+            else:
                 shutil.rmtree(temp_dir)
-                print(f"Cleaned up: {temp_dir}")
+            print(f"Cleaned up: {temp_dir}")
 
     @staticmethod
     def init_folders():
@@ -364,6 +1013,42 @@ class UmaReplace:
         if not os.path.isdir(EDITED_PATH):
             os.makedirs(EDITED_PATH)
 
+    def _get_stage_path(self) -> str:
+        """
+        与游戏 dat 目录同级的暂存目录, 与游戏文件位于同一文件系统, 又不会被游戏扫描到
+        """
+        return f"{self.base_path}/.uma_stage_{os.getpid()}"
+
+    def _cleanup_stale_stages(self):
+        """
+        删除已退出的进程 (崩溃或被结束) 遗留的暂存目录
+        旧版本把暂存目录放在 dat 目录内, 一并检查
+        """
+        for parent in (self.base_path, f"{self.base_path}/dat"):
+            try:
+                names = os.listdir(parent)
+            except OSError:
+                continue
+            for name in names:
+                if not name.startswith(".uma_stage_"):
+                    continue
+                # 后台删除时目录会被重命名为 .uma_stage_<pid>.trash_<uuid>
+                pid = name[len(".uma_stage_"):].split(".", 1)[0]
+                if not pid.isdigit() or _pid_alive(int(pid)):
+                    continue
+                shutil.rmtree(f"{parent}/{name}", ignore_errors=True)
+
+    @staticmethod
+    def _install_bundle(src: str, dst: str):
+        """
+        将加密后的临时文件放回游戏目录
+        临时文件随后会被清理, 无需保留, 同一文件系统上直接重命名, 跨设备时退回复制
+        """
+        try:
+            os.replace(src, dst)
+        except OSError:
+            _fastcopy(src, dst)
+
     def get_bundle_path(self, bundle_hash: str):
         return f"{self.base_path}/dat/{bundle_hash[:2]}/{bundle_hash}"
 
@@ -374,7 +1059,12 @@ class UmaReplace:
         :param query_orig_id: 原始 ID，用于模糊查询
         :return: bundle hash
         """
-        cursor = self.conn.cursor()
+        key = (path, query_orig_id)
+        cached = self._hash_cache.get(key)
+        if cached is not None:
+            return cached
+
+        cursor = self._cur
         query = cursor.execute("SELECT h FROM a WHERE n=?", [path]).fetchone()
         if query is None:
             if (query_orig_id is not None) and ("_" in query_orig_id):
@@ -389,12 +1079,72 @@ class UmaReplace:
         if query is None:
             raise UmaFileNotFoundError(f"{path} not found!")
 
-        cursor.close()
+        self._hash_cache[key] = query[0]
         return query[0]
 
+    def _bundle_hashes_for(self, paths: t.List[str]) -> t.Dict[str, str]:
+        """
+        批量查询资源路径对应的 bundle hash (仅精确匹配)
+        :param paths: 资源路径列表
+        :return: {资源路径: bundle hash}, 未找到的路径不包含在内
+        """
+        result = {}
+        paths = list(dict.fromkeys(paths))
+        cursor = self.conn.cursor()
+        # SQLite 单条语句的参数数量有上限, 分块查询
+        for start in range(0, len(paths), 900):
+            chunk = paths[start:start + 900]
+            placeholders = ",".join("?" * len(chunk))
+            for n, h in cursor.execute(f"SELECT n, h FROM a WHERE n IN ({placeholders})", chunk):
+                result[n] = h
+        cursor.close()
+        return result
+
     def file_backup(self, bundle_hash: str):
         if not os.path.isfile(f"{BACKUP_PATH}/{bundle_hash}"):
-            shutil.copyfile(f"{self.get_bundle_path(bundle_hash)}", f"{BACKUP_PATH}/{bundle_hash}")
+            self._backup_one(bundle_hash)
+
+    def _backup_one(self, bundle_hash: str):
+        """
+        备份单个 bundle: 先复制到临时目录, 完整复制后再移入 BACKUP_PATH,
+        中断或失败时不会留下被当作有效备份的不完整文件
+        :param bundle_hash: bundle hash
+        """
+        temp_dir = f"{BACKUP_PATH}_temp"
+        os.makedirs(temp_dir, exist_ok=True)
+        temp_path = f"{temp_dir}/{bundle_hash}.{uuid.uuid4().hex}"
+        try:
+            shutil.copyfile(self.get_bundle_path(bundle_hash), temp_path)
+            os.replace(temp_path, f"{BACKUP_PATH}/{bundle_hash}")
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+
+    def file_backup_batch(self, bundle_hashes: t.List[str]) -> t.Set[str]:
+        """
+        批量备份: 只扫描一次备份目录, 并行复制尚未备份的文件
+        :param bundle_hashes: bundle hash 列表
+        :return: 备份失败的 hash, 调用方不能再修改这些 bundle
+        """
+        existing = set(os.listdir(BACKUP_PATH))
+        todo = [h for h in dict.fromkeys(bundle_hashes) if h not in existing]
+        if not todo:
+            return set()
+
+        def _try_backup(bundle_hash: str) -> bool:
+            try:
+                self._backup_one(bundle_hash)
+                return True
+            except Exception as e:
+                print(f"⚠️  Failed to backup {bundle_hash}, skipping it: {e}")
+                return False
+
+        with ThreadPoolExecutor(max_workers=min(16, len(todo))) as executor:
+            results = list(executor.map(_try_backup, todo))
+        return {bundle_hash for bundle_hash, ok in zip(todo, results) if not ok}
 
     def file_restore(self, hashs: t.Optional[t.List[str]] = None):
         """
@@ -415,48 +1165,58 @@ class UmaReplace:
     @staticmethod
     def replace_file_path(fname: str, id1: str, id2: str, save_name: t.Optional[str] = None) -> str:
         env = UnityPy.load(fname)
+        # 编码只在进入对象循环前进行一次
+        old_b = id1.encode("utf8")
+        new_b = id2.encode("utf8")
 
-        data = None
+        has_objects = False
+        any_object_changed = False
 
         for obj in env.objects:
-            # if obj.type.name not in ["Avatar"]:
-            data = obj.read()
-            # print(obj.type.name, data.name)
-            if obj.type.name == "MonoBehaviour":
+            has_objects = True
+            raw = bytes(obj.get_raw_data())
+            # 先快速判断是否包含 ID, 不包含的对象无需解析与替换
+            if old_b not in raw:
+                continue
+
+            if obj.type is ClassIDType.MonoBehaviour:
+                data = obj.read()
                 if (hasattr(data, "raw_data")):
                     raw = bytes(data.raw_data)
-                    raw, changed = replace_raw(raw, old=id1.encode("utf8"), new=id2.encode("utf8"))
-                    data.set_raw_data(raw)
-                    data.save(raw_data=raw)
-                    # if(changed):
-                    #    print(data.m_Name)
+                    raw, changed = replace_raw(raw, old_b, new_b)
+                    if changed:
+                        data.set_raw_data(raw)
+                        data.save(raw_data=raw)
                 else:
-                    raw = bytes(obj.get_raw_data())
-                    raw, changed = replace_raw(raw, old=id1.encode("utf8"), new=id2.encode("utf8"))
-                    obj.set_raw_data(raw)
-                    # if(changed):
-                    #    print(data.m_Name)
+                    raw, changed = replace_raw(raw, old_b, new_b)
+                    if changed:
+                        obj.set_raw_data(raw)
 
             else:
-                # print(obj.type.name)
-                raw = bytes(obj.get_raw_data())
-                raw, changed = replace_raw(raw, old=id1.encode("utf8"), new=id2.encode("utf8"))
-                obj.set_raw_data(raw)
-                # if(changed):
-                #    print(data.m_Name)
-                # obj.save()
+                raw, changed = replace_raw(raw, old_b, new_b)
+                if changed:
+                    obj.set_raw_data(raw)
+            any_object_changed = any_object_changed or changed
 
         if save_name is None:
             save_name = f"{EDITED_PATH}/{os.path.split(fname)[-1]}"
-        if data is None:
-            with open(fname, "rb") as f:
-                data = f.read()
-                data = data.replace(id1.encode("utf8"), id2.encode("utf8"))
-            with open(save_name, "wb") as f:
-                f.write(data)
+        if not has_objects:
+            # 非 Unity 资源 (如音频), 先在内存映射上查找, 仅在需要替换时才读入完整内容
+            content = None
+            if os.path.getsize(fname) > 0:
+                with open(fname, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    if mm.find(old_b) >= 0:
+                        content, _ = replace_raw(bytes(mm), old_b, new_b)
+            if content is None:
+                _fastcopy(fname, save_name)
+            else:
+                with open(save_name, "wb") as f:
+                    f.write(content)
+        elif not any_object_changed:
+            # 没有任何对象被修改, 无需重新序列化
+            _fastcopy(fname, save_name)
         else:
-            with open(save_name, "wb") as f:
-                f.write(env.file.save())
+            _save_env_file(env, save_name)
         return save_name
 
     def replace_file_ids_with_encryption(self, orig_path: str, new_path: str, id_orig: str, id_new: str):
@@ -496,14 +1256,13 @@ class UmaReplace:
                 self._cleanup_temp_dirs()
                 return
 
-            # 复制加密后的文件回游戏目录
-            shutil.copyfile(encrypted_paths[0], self.get_bundle_path(orig_hash))
+            # 将加密后的文件移动回游戏目录
+            self._install_bundle(encrypted_paths[0], self.get_bundle_path(orig_hash))
             print(f"✅ Replace completed: {orig_path} -> {new_path}")
 
         except Exception as e:
             print(f"❌ Error in replace_file_ids_with_encryption: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("replace_file_ids_with_encryption failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -523,6 +1282,178 @@ class UmaReplace:
                                                       f"{EDITED_PATH}/{orig_hash}")
         shutil.copyfile(edt_bundle_file_path, self.get_bundle_path(orig_hash))
 
+    def session(self) -> "ReplaceSession":
+        """
+        创建一个批量替换会话, 会话期间的 replace_body/head/tail 只会排队,
+        退出时统一进行一次解密与一次加密
+        例: with uma.session(): uma.replace_head(...); uma.replace_body(...)
+        """
+        return ReplaceSession(self)
+
+    def _run_replace_jobs(self, jobs: list) -> bool:
+        """
+        执行 ID 替换任务, 解密、替换 ID、加密三个阶段由 _pipeline_process 按块流水线执行
+        :param jobs: (orig_hash, new_hash, orig_path, new_path, id_orig, id_new) 列表
+        :return: 是否有文件被成功替换
+        """
+        # 同一原始文件只替换一次, 以最后一个任务为准
+        jobs = list({job[0]: job for job in jobs}.values())
+        installed = self._pipeline_process(
+            [job[1] for job in jobs],
+            [functools.partial(_replace_ids_worker, id_from=id_new, id_to=id_orig, edited_root=EDITED_PATH)
+             for _, _, _, _, id_orig, id_new in jobs],
+            target_hashes=[job[0] for job in jobs])
+        for orig_hash, _, orig_path, new_path, _, _ in jobs:
+            if orig_hash in installed:
+                print(f"✅ Replaced: {orig_path} -> {new_path}")
+
+        if not installed:
+            print("❌ 没有文件被成功处理")
+            return False
+        return True
+
+    def _pipeline_process(self, bundle_hashes: list,
+                          edit_fn: t.Union[t.Callable[[str, str], t.Optional[str]], t.List[t.Callable]],
+                          target_hashes: t.Optional[list] = None,
+                          executor_cls=ProcessPoolExecutor) -> t.Dict[str, str]:
+        """
+        按块流水线执行 解密 -> 修改 -> 加密并放回游戏目录
+        前一块在修改/加密时, 后一块已在解密, 队列有上限以限制同时存在的中间文件
+        任一阶段出错时通知其余阶段停止, 异常在所有阶段退出后重新抛出
+        :param bundle_hashes: 需要解密的 bundle hash 列表
+        :param edit_fn: edit_fn(解密后的文件路径, 目标 bundle hash) -> 修改后的文件路径或 None
+                        也可以是与 bundle_hashes 一一对应的列表, 每个文件使用各自的修改函数
+                        使用多进程时必须可被 pickle (模块级函数或其 functools.partial)
+        :param target_hashes: 修改结果对应的 bundle hash, 与 bundle_hashes 一一对应, 默认与 bundle_hashes 相同
+        :param executor_cls: 修改阶段使用的执行器类型
+        :return: {目标 bundle hash: 游戏目录内的路径}, 只包含成功放回的文件
+        """
+        if target_hashes is None:
+            target_hashes = bundle_hashes
+        edit_fns = edit_fn if isinstance(edit_fn, list) else [edit_fn] * len(bundle_hashes)
+        # 同一目标只处理一次, 避免并行修改同一个文件
+        by_target = {target: (source, fn) for source, target, fn in zip(bundle_hashes, target_hashes, edit_fns)}
+        items = [(source, target, fn) for target, (source, fn) in by_target.items()]
+        chunks = [items[i:i + PIPELINE_CHUNK_SIZE] for i in range(0, len(items), PIPELINE_CHUNK_SIZE)]
+        edit_queue = queue.Queue(maxsize=4)
+        encrypt_queue = queue.Queue(maxsize=4)
+        stop = threading.Event()
+        installed = {}
+        # 已解密、尚未修改完的块, 结束时统一解除固定
+        pinned = []
+        pinned_lock = threading.Lock()
+
+        def unpin(sources: list):
+            with pinned_lock:
+                if sources not in pinned:
+                    return
+                pinned.remove(sources)
+            self._unpin_decrypted(sources)
+
+        def put(q: queue.Queue, item) -> bool:
+            # 下游阶段已退出时不再阻塞等待, 避免死锁
+            while not stop.is_set():
+                try:
+                    q.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def get(q: queue.Queue):
+            while not stop.is_set():
+                try:
+                    return q.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+            return None
+
+        def decrypt_worker():
+            try:
+                for chunk in chunks:
+                    if stop.is_set():
+                        break
+                    decrypted_by_hash = self._decrypt_dat_bundles_map([source for source, _, _ in chunk])
+                    if not decrypted_by_hash:
+                        print("❌ Failed to decrypt bundles")
+                        continue
+                    # 下一块解密时可能淘汰缓存, 先固定本块的解密文件直到修改完成
+                    sources = list(decrypted_by_hash)
+                    self._pin_decrypted(sources)
+                    with pinned_lock:
+                        pinned.append(sources)
+                    ready = [(decrypted_by_hash[source], target, fn) for source, target, fn in chunk
+                             if source in decrypted_by_hash]
+                    if not put(edit_queue, (sources, ready)):
+                        break
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                put(edit_queue, None)
+
+        def edit_worker():
+            try:
+                # Windows 上 ProcessPoolExecutor 最多支持 61 个工作进程
+                with executor_cls(max_workers=min(61, os.cpu_count() or 1)) as executor:
+                    while True:
+                        item = get(edit_queue)
+                        if item is None:
+                            break
+                        sources, ready = item
+                        print(f"Processing {len(ready)} bundles...")
+                        futures = {executor.submit(fn, path, target): target for path, target, fn in ready}
+                        edited = []
+                        for future in as_completed(futures):
+                            target = futures[future]
+                            try:
+                                edited_file = future.result()
+                            except Exception as e:
+                                print(f"⚠️  Error editing bundle {target}: {type(e).__name__}: {e}")
+                                continue
+                            if edited_file is not None:
+                                edited.append((edited_file, target))
+                        unpin(sources)
+                        if edited and not put(encrypt_queue, edited):
+                            break
+            except BaseException:
+                stop.set()
+                raise
+            finally:
+                put(encrypt_queue, None)
+
+        def encrypt_worker():
+            try:
+                while True:
+                    edited = get(encrypt_queue)
+                    if edited is None:
+                        break
+                    try:
+                        targets = [target for _, target in edited]
+                        installed_paths = self._encrypt_dat_bundles_batch([edited_file for edited_file, _ in edited],
+                                                                          targets, install=True)
+                    except Exception as e:
+                        print(f"❌ Failed to encrypt bundles: {type(e).__name__}: {e}")
+                        continue
+                    installed_paths = set(installed_paths)
+                    for target in targets:
+                        if self.get_bundle_path(target) in installed_paths:
+                            installed[target] = self.get_bundle_path(target)
+            except BaseException:
+                stop.set()
+                raise
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            stages = [executor.submit(decrypt_worker), executor.submit(edit_worker), executor.submit(encrypt_worker)]
+        # 中途停止时队列里可能还有未修改的块
+        for sources in list(pinned):
+            unpin(sources)
+        # 所有阶段退出后再抛出第一个异常
+        for stage in stages:
+            stage.result()
+
+        return installed
+
     def _replace_assets_batch(self, orig_paths: list, new_paths: list, id_orig: str, id_new: str,
                               asset_type: str = "asset"):
         """
@@ -534,88 +1465,48 @@ class UmaReplace:
         :param asset_type: 资源类型名称（用于日志输出）
         """
         try:
-            # 收集所有需要处理的 bundle hash
-            bundle_info = []
+            # 收集所有需要处理的 bundle hash, 先批量精确查询, 未命中的再走模糊查询
+            orig_hash_map = self._bundle_hashes_for(orig_paths)
+            new_hash_map = self._bundle_hashes_for(new_paths)
+            jobs = []
             for i in range(len(orig_paths)):
                 try:
-                    orig_hash = self.get_bundle_hash(orig_paths[i], id_orig)
-                    new_hash = self.get_bundle_hash(new_paths[i], id_new)
-                    bundle_info.append((orig_hash, new_hash, orig_paths[i], new_paths[i]))
+                    orig_hash = orig_hash_map.get(orig_paths[i]) or self.get_bundle_hash(orig_paths[i], id_orig)
+                    new_hash = new_hash_map.get(new_paths[i]) or self.get_bundle_hash(new_paths[i], id_new)
+                    jobs.append((orig_hash, new_hash, orig_paths[i], new_paths[i], id_orig, id_new))
                 except UmaFileNotFoundError as e:
                     print(f"⚠️  {e}")
                     continue
 
-            if not bundle_info:
+            if not jobs:
                 print("❌ 没有找到需要处理的资源")
                 return
 
             # 备份所有原始文件
-            print(f"Backing up {len(bundle_info)} files...")
-            for orig_hash, _, _, _ in bundle_info:
-                try:
-                    self.file_backup(orig_hash)
-                except Exception as e:
-                    print(f"⚠️  Failed to backup {orig_hash}: {e}")
-
-            # 解密所有新文件
-            new_hashes = [new_hash for _, new_hash, _, _ in bundle_info]
-            decrypted_new_paths = self._decrypt_dat_bundles_batch(new_hashes)
-
-            if not decrypted_new_paths:
-                print("❌ 解密失败")
-                self._cleanup_temp_dirs()
-                return
-
-            # 处理每个文件：替换 ID 并保存到 edited 目录
-            print(f"Replacing IDs in {len(decrypted_new_paths)} files...")
-            edited_files = []
-            valid_bundle_indices = []  # 记录哪些bundle成功处理
-
-            for i, decrypted_path in enumerate(decrypted_new_paths):
-                try:
-                    orig_hash, _, _, _ = bundle_info[i]
-                    edited_file = self.replace_file_path(decrypted_path, id_new, id_orig,
-                                                         f"{EDITED_PATH}/{orig_hash}")
-                    edited_files.append(edited_file)
-                    valid_bundle_indices.append(i)
-                except Exception as e:
-                    print(f"⚠️  Error replacing IDs in bundle {i}: {type(e).__name__}: {e}")
-                    continue
-
-            if not edited_files:
-                print("❌ 没有文件被成功处理")
-                self._cleanup_temp_dirs()
+            print(f"Backing up {len(jobs)} files...")
+            failed = self.file_backup_batch([job[0] for job in jobs])
+            # 没有备份的文件不做修改
+            jobs = [job for job in jobs if job[0] not in failed]
+            if not jobs:
+                print("❌ 没有文件被成功备份")
                 return
 
-            # 批量加密所有修改后的文件（只加密成功处理的文件）
-            valid_orig_hashes = [bundle_info[i][0] for i in valid_bundle_indices]
-            encrypted_paths = self._encrypt_dat_bundles_batch(edited_files, valid_orig_hashes)
-
-            if not encrypted_paths:
-                print("❌ 加密失败")
-                self._cleanup_temp_dirs()
+            # 会话中只排队, 退出会话时统一处理
+            if self._session is not None:
+                # 同一原始文件以会话中最后一次替换为准
+                self._session.jobs.update((job[0], job) for job in jobs)
+                print(f"Queued {asset_type} replacement: {id_orig} -> {id_new}")
                 return
 
-            # 复制加密后的文件回游戏目录
-            print(f"Copying {len(encrypted_paths)} files back to game directory...")
-            for i, encrypted_path in enumerate(encrypted_paths):
-                try:
-                    bundle_index = valid_bundle_indices[i]
-                    orig_hash, _, orig_path, new_path = bundle_info[bundle_index]
-                    shutil.copyfile(encrypted_path, self.get_bundle_path(orig_hash))
-                    print(f"✅ Replaced: {orig_path} -> {new_path}")
-                except Exception as e:
-                    print(f"⚠️  Error copying encrypted file back: {type(e).__name__}: {e}")
-
-            # 清理临时目录
-            self._cleanup_temp_dirs()
-            print(f"✅ {asset_type.capitalize()} replacement completed: {id_orig} -> {id_new}")
+            if self._run_replace_jobs(jobs):
+                print(f"✅ {asset_type.capitalize()} replacement completed: {id_orig} -> {id_new}")
 
         except Exception as e:
             print(f"❌ Error in {asset_type} replacement: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
-            self._cleanup_temp_dirs()
+            log.debug("%s replacement failed", asset_type, exc_info=True)
+        finally:
+            if self._session is None:
+                self._cleanup_temp_dirs()
 
     def replace_body(self, id_orig: str, id_new: str):
         """
@@ -711,22 +1602,18 @@ class UmaReplace:
             # 加载并修改
             env = UnityPy.load(decrypted_path)
 
-            for obj in env.objects:
-                if obj.type.name == "MonoBehaviour":
-                    if obj.serialized_type.nodes:
-                        tree = obj.read_typetree()
-                        if "runtime_gac_chr_start_00" in tree["m_Name"]:
-                            tree["_characterList"][0]["_characterKeys"]["_selectCharaId"] = int(dress_id[:-2])
-                            tree["_characterList"][0]["_characterKeys"]["_selectClothId"] = int(dress_id)
-                            obj.save_typetree(tree)
-                            print(f"✅ Updated gac_chr_start: CharaId={dress_id[:-2]}, ClothId={dress_id}")
+            for obj in _objects_of_type(env, ClassIDType.MonoBehaviour):
+                if obj.serialized_type.nodes:
+                    tree = obj.read_typetree()
+                    if "runtime_gac_chr_start_00" in tree["m_Name"]:
+                        tree["_characterList"][0]["_characterKeys"]["_selectCharaId"] = int(dress_id[:-2])
+                        tree["_characterList"][0]["_characterKeys"]["_selectClothId"] = int(dress_id)
+                        obj.save_typetree(tree)
+                        print(f"✅ Updated gac_chr_start: CharaId={dress_id[:-2]}, ClothId={dress_id}")
 
             # 保存修改后的文件
             edited_file = f"{EDITED_PATH}/{orig_hash}"
-            os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-            with open(edited_file, "wb") as f:
-                f.write(env.file.save())
+            _save_env_file(env, edited_file)
 
             # 加密修改后的文件
             encrypted_paths = self._encrypt_dat_bundles_batch([edited_file], [orig_hash])
@@ -735,14 +1622,13 @@ class UmaReplace:
                 print("❌ Failed to encrypt bundle")
                 return
 
-            # 复制加密后的文件回游戏目录
-            shutil.copyfile(encrypted_paths[0], self.get_bundle_path(orig_hash))
+            # 将加密后的文件移动回游戏目录
+            self._install_bundle(encrypted_paths[0], self.get_bundle_path(orig_hash))
             print(f"✅ Gac chr start replacement completed: {dress_id}")
 
         except Exception as e:
             print(f"❌ Error in edit_gac_chr_start: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("edit_gac_chr_start failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -782,14 +1668,18 @@ class UmaReplace:
             target_clothe_id = None
             target_cy_spring_name_list = None
 
-            for obj in target.objects:
-                if obj.type.name == "MonoBehaviour":
-                    if obj.serialized_type.nodes:
-                        tree = obj.read_typetree()
-                        if "runtime_crd1" in tree["m_Name"]:
-                            target_tree = tree
-                            for character in tree["_characterList"]:
-                                target_clothe_id = str(character["_characterKeys"]["_selectClothId"])
+            for obj in _objects_of_type(target, ClassIDType.MonoBehaviour):
+                # 名称会以字符串形式出现在原始数据中, 先快速过滤, 避免解析无关对象的 typetree
+                if not obj.serialized_type.nodes:
+                    continue
+                if b"runtime_crd1" not in obj.get_raw_data():
+                    continue
+                tree = obj.read_typetree()
+                if "runtime_crd1" in tree["m_Name"]:
+                    target_tree = tree
+                    for character in tree["_characterList"]:
+                        target_clothe_id = str(character["_characterKeys"]["_selectClothId"])
+                    break
 
             if target_tree is None:
                 print("❌ Target data cannot be parsed")
@@ -804,28 +1694,28 @@ class UmaReplace:
             # 加载并修改原始文件
             env = UnityPy.load(orig_decrypted_path)
 
-            for obj in env.objects:
-                if obj.type.name == "MonoBehaviour":
-                    if obj.serialized_type.nodes:
-                        tree = obj.read_typetree()
-                        if "runtime_crd1" in tree["m_Name"]:
-                            for character in tree["_characterList"]:
-                                character["_characterKeys"]["_selectCharaId"] = int(target_clothe_id[:-2])
-                                character["_characterKeys"]["_selectClothId"] = int(target_clothe_id)
-                                character["_characterKeys"]["_selectHeadId"] = 0
-                                for outputList in character["_characterKeys"]["thisList"]:
-                                    if len(outputList["_enableCySpringList"]) > 0:
-                                        outputList["_enableCySpringList"] = [1] * len(target_cy_spring_name_list)
-                                        outputList["_targetCySpringNameList"] = target_cy_spring_name_list
-                            obj.save_typetree(tree)
-                            print(f"✅ Updated skill data: CharaId={target_clothe_id[:-2]}, ClothId={target_clothe_id}")
+            for obj in _objects_of_type(env, ClassIDType.MonoBehaviour):
+                if not obj.serialized_type.nodes:
+                    continue
+                if b"runtime_crd1" not in obj.get_raw_data():
+                    continue
+                tree = obj.read_typetree()
+                if "runtime_crd1" in tree["m_Name"]:
+                    for character in tree["_characterList"]:
+                        character["_characterKeys"]["_selectCharaId"] = int(target_clothe_id[:-2])
+                        character["_characterKeys"]["_selectClothId"] = int(target_clothe_id)
+                        character["_characterKeys"]["_selectHeadId"] = 0
+                        for outputList in character["_characterKeys"]["thisList"]:
+                            if len(outputList["_enableCySpringList"]) > 0:
+                                outputList["_enableCySpringList"] = [1] * len(target_cy_spring_name_list)
+                                outputList["_targetCySpringNameList"] = target_cy_spring_name_list
+                    obj.save_typetree(tree)
+                    print(f"✅ Updated skill data: CharaId={target_clothe_id[:-2]}, ClothId={target_clothe_id}")
+                    break
 
             # 保存修改后的文件
             edited_file = f"{EDITED_PATH}/{orig_hash}"
-            os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-            with open(edited_file, "wb") as f:
-                f.write(env.file.save())
+            _save_env_file(env, edited_file)
 
             # 加密修改后的文件
             encrypted_paths = self._encrypt_dat_bundles_batch([edited_file], [orig_hash])
@@ -835,16 +1725,15 @@ class UmaReplace:
                 self._cleanup_temp_dirs()
                 return
 
-            # 复制加密后的文件回游戏目录
-            shutil.copyfile(encrypted_paths[0], self.get_bundle_path(orig_hash))
+            # 将加密后的文件移动回游戏目录
+            self._install_bundle(encrypted_paths[0], self.get_bundle_path(orig_hash))
             print(f"✅ Skill replacement completed: {id_orig} -> {id_target}")
 
         except UmaFileNotFoundError as e:
             print(f"❌ {e}")
         except Exception as e:
             print(f"❌ Error in edit_cutin_skill: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("edit_cutin_skill failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -875,40 +1764,26 @@ class UmaReplace:
 
             # 备份所有原始文件
             print(f"Backing up {len(bundle_info)} files...")
-            for orig_hash, _, _, _ in bundle_info:
-                self.file_backup(orig_hash)
-
-            # 解密所有新文件
-            new_hashes = [new_hash for _, new_hash, _, _ in bundle_info]
-            decrypted_new_paths = self._decrypt_dat_bundles_batch(new_hashes)
-
-            if not decrypted_new_paths:
-                print("❌ 解密失败")
+            failed = self.file_backup_batch([orig_hash for orig_hash, _, _, _ in bundle_info])
+            # 没有备份的文件不做修改
+            bundle_info = [info for info in bundle_info if info[0] not in failed]
+            if not bundle_info:
+                print("❌ 没有文件被成功备份")
                 return
 
-            # 处理每个文件：替换 ID 并保存到 edited 目录
-            print(f"Replacing IDs in {len(decrypted_new_paths)} files...")
-            edited_files = []
-            for i, decrypted_path in enumerate(decrypted_new_paths):
-                orig_hash, _, _, _ = bundle_info[i]
-                edited_file = self.replace_file_path(decrypted_path, id_new, id_orig,
-                                                     f"{EDITED_PATH}/{orig_hash}")
-                edited_files.append(edited_file)
-
-            # 批量加密所有修改后的文件
-            orig_hashes = [orig_hash for orig_hash, _, _, _ in bundle_info]
-            encrypted_paths = self._encrypt_dat_bundles_batch(edited_files, orig_hashes)
+            # 解密新文件、替换 ID (保存为原文件的 hash)、加密并放回游戏目录
+            installed = self._pipeline_process(
+                [new_hash for _, new_hash, _, _ in bundle_info],
+                functools.partial(_replace_ids_worker, id_from=id_new, id_to=id_orig, edited_root=EDITED_PATH),
+                target_hashes=[orig_hash for orig_hash, _, _, _ in bundle_info])
 
-            if not encrypted_paths:
-                print("❌ 加密失败")
+            if not installed:
+                print("❌ 没有文件被成功处理")
                 return
 
-            # 复制加密后的文件回游戏目录
-            print(f"Copying {len(encrypted_paths)} files back to game directory...")
-            for i, encrypted_path in enumerate(encrypted_paths):
-                orig_hash, _, orig_path, new_path = bundle_info[i]
-                shutil.copyfile(encrypted_path, self.get_bundle_path(orig_hash))
-                print(f"✅ Replaced: {orig_path} -> {new_path}")
+            for orig_hash, _, orig_path, new_path in bundle_info:
+                if orig_hash in installed:
+                    print(f"✅ Replaced: {orig_path} -> {new_path}")
 
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -916,20 +1791,14 @@ class UmaReplace:
 
         except Exception as e:
             print(f"❌ Error in replace_race_result: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("replace_race_result failed", exc_info=True)
             self._cleanup_temp_dirs()
 
     def unlock_live_dress(self):
 
-        def dict_factory(cursor, row):
-            d = {}
-            for idx, col in enumerate(cursor.description):
-                d[col[0]] = row[idx]
-            return d
-
         def get_all_dress_in_table():
-            self.master_conn.row_factory = dict_factory
+            # sqlite3.Row 同时支持按下标与列名访问, 无需逐行构造 dict
+            self.master_conn.row_factory = sqlite3.Row
             cursor = self.master_conn.cursor()
             cursor.execute("SELECT * FROM dress_data")
             # fetchall as result
@@ -939,52 +1808,51 @@ class UmaReplace:
             return query
 
         def get_unique_in_table():
-            self.conn.row_factory = dict_factory
+            # 会话期间结果不变, 缓存在实例上
+            if self._pfb_chr1_unique_cache is not None:
+                return self._pfb_chr1_unique_cache
             cursor = self.conn.cursor()
-            cursor.execute("SELECT n FROM a WHERE n like '%pfb_chr1____90'")
+            # 等价于 n LIKE '%pfb_chr1____90', 但可以使用 idx_a_n_pfb 索引
+            cursor.execute("SELECT n FROM a WHERE substr(n, -14, 8) = 'pfb_chr1' AND substr(n, -2) = '90'")
             # fetchall as result
             names = cursor.fetchall()
             # close connection
             cursor.close()
             list = []
             for name in names:
-                list.append(name["n"][-7:-3])
+                list.append(name[0][-7:-3])
+            self._pfb_chr1_unique_cache = list
             return list
 
-        def create_data(dress, unique):
-            dress['id'] = dress['id'] + 89
-            dress['body_type_sub'] = 90
-            if str(dress['id'])[:-2] in set(unique):
-                dress['head_sub_id'] = 90
-            else:
-                dress['head_sub_id'] = 0
-            self.master_conn.row_factory = dict_factory
-            cursor = self.master_conn.cursor()
-            cursor.execute("INSERT INTO dress_data VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?,?)",
-                           [dress['id'], dress['condition_type'], dress['have_mini'], dress['general_purpose'],
-                            dress['costume_type'], dress['chara_id'], dress['use_gender'], dress['body_shape'],
-                            dress['body_type'], dress['body_type_sub'], dress['body_setting'], dress['use_race'],
-                            dress['use_live'], dress['use_live_theater'], dress['use_home'], dress['use_dress_change'],
-                            dress['is_wet'], dress['is_dirt'], dress['head_sub_id'], dress['use_season'],
-                            dress['dress_color_main'], dress['dress_color_sub'], dress['color_num'],
-                            dress['disp_order'],
-                            dress['tail_model_id'], dress['tail_model_sub_id'], dress['mini_mayu_shader_type'],
-                            dress['start_time'], dress['end_time']])
-            self.master_conn.commit()
-            cursor.close()
+        def create_data(dress, dress_id, id_str, unique_set):
+            # xxxx01 -> xxxx90, 前四位不变
+            overrides = {
+                "id": dress_id + 89,
+                "body_type_sub": 90,
+                "head_sub_id": 90 if id_str[:-2] in unique_set else 0
+            }
+            return tuple(overrides[k] if k in overrides else dress[k] for k in _DRESS_COLUMNS)
 
         def unlock_data():
-            self.master_conn.row_factory = dict_factory
             cursor = self.master_conn.cursor()
             cursor.execute("UPDATE dress_data SET use_live = 1, use_live_theater = 1")
             self.master_conn.commit()
             cursor.close()
 
         dresses = get_all_dress_in_table()
-        unique = get_unique_in_table()
+        unique_set = frozenset(get_unique_in_table())
+        rows = []
         for dress in dresses:
-            if 100000 < dress['id'] < 200000 and str(dress['id']).endswith('01'):
-                create_data(dress, unique)
+            dress_id = dress['id']
+            if not 100000 < dress_id < 200000:
+                continue
+            id_str = str(dress_id)
+            if not id_str.endswith('01'):
+                continue
+            rows.append(create_data(dress, dress_id, id_str, unique_set))
+        # 所有新增数据在同一个事务中写入
+        with self.master_conn:
+            self.master_conn.executemany(_INSERT_DRESS_SQL, rows)
         unlock_data()
 
     def clear_live_blur(self, edit_id: str):
@@ -1012,100 +1880,31 @@ class UmaReplace:
         # 备份所有原始文件
         try:
             print(f"Backing up {len(bundles_to_process)} files...")
-            for _, bn, _ in bundles_to_process:
-                self.file_backup(bn)
-
-            # 解密所有需要处理的 bundle
-            bundle_hashes = [bn for _, bn, _ in bundles_to_process]
-            decrypted_paths = self._decrypt_dat_bundles_batch(bundle_hashes)
-
-            if not decrypted_paths:
-                print("❌ Failed to decrypt bundles")
-                self._cleanup_temp_dirs()
+            failed = self.file_backup_batch([bn for _, bn, _ in bundles_to_process])
+            # 没有备份的文件不做修改
+            bundles_to_process = [item for item in bundles_to_process if item[1] not in failed]
+            if not bundles_to_process:
+                print("❌ No bundles were backed up")
                 return
 
-            # 处理每个解密后的文件
-            print(f"Processing {len(decrypted_paths)} bundles...")
-            edited_files = []
-            for i, decrypted_path in enumerate(decrypted_paths):
-                n, bn, path_name = bundles_to_process[i]
-                print(f"Editing: {path_name} ({n + 1}/{tLen})")
-                try:
-                    env = UnityPy.load(decrypted_path)
-                    for obj in env.objects:
-                        if obj.type.name == "MonoBehaviour":
-                            if not obj.serialized_type.nodes:
-                                continue
-                            tree = obj.read_typetree()
-
-                            tree['postEffectDOFKeys']['thisList'] = [tree['postEffectDOFKeys']['thisList'][0]]
-                            dof_set_data = {
-                                "frame": 0,
-                                "attribute": 327680,
-                                "interpolateType": 0,
-                                "curve": {
-                                    "m_Curve": [],
-                                    "m_PreInfinity": 2,
-                                    "m_PostInfinity": 2,
-                                    "m_RotationOrder": 4
-                                },
-                                "easingType": 0,
-                                "forcalSize": 30.0,
-                                "blurSpread": 20.0,
-                                "charactor": 1,
-                                "dofBlurType": 3,
-                                "dofQuality": 1,
-                                "dofForegroundSize": 0.0,
-                                "dofFgBlurSpread": 1.0,
-                                "dofFocalPoint": 1.0,
-                                "dofSmoothness": 1.0,
-                                "BallBlurPowerFactor": 0.0,
-                                "BallBlurBrightnessThreshhold": 0.0,
-                                "BallBlurBrightnessIntensity": 1.0,
-                                "BallBlurSpread": 0.0
-                            }
-                            for k in dof_set_data:
-                                tree['postEffectDOFKeys']['thisList'][0][k] = dof_set_data[k]
-
-                            tree['postEffectBloomDiffusionKeys']['thisList'] = []
-                            tree['radialBlurKeys']['thisList'] = []
-
-                            obj.save_typetree(tree)
-
-                    # 保存修改后的文件
-                    edited_file = f"{EDITED_PATH}/{bn}"
-                    os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-                    with open(edited_file, "wb") as f:
-                        f.write(env.file.save())
-
-                    edited_files.append(edited_file)
-                    print(f"✅ Edited: {path_name}")
-
-                except Exception as e:
-                    print(f"❌ Exception occurred when editing file: {bn}\n{e}")
-
-            # 批量加密所有修改后的文件
-            encrypted_paths = self._encrypt_dat_bundles_batch(edited_files, bundle_hashes)
+            # 各 bundle 互不依赖, 解密、修改 (多进程)、加密并放回游戏目录按块流水线执行
+            installed = self._pipeline_process(
+                [bn for _, bn, _ in bundles_to_process],
+                functools.partial(_edit_one_camera_bundle, edited_root=EDITED_PATH))
 
-            if not encrypted_paths:
-                print("❌ Failed to encrypt bundles")
-                self._cleanup_temp_dirs()
+            if not installed:
+                print("❌ No bundles were successfully processed")
                 return
 
-            # 复制加密后的文件回游戏目录
-            print(f"Copying {len(encrypted_paths)} files back to game directory...")
-            for i, encrypted_path in enumerate(encrypted_paths):
-                bn = bundles_to_process[i][1]
-                shutil.copyfile(encrypted_path, self.get_bundle_path(bn))
-                print(f"✅ Updated: {bn}")
+            for n, bn, path_name in bundles_to_process:
+                if bn in installed:
+                    print(f"✅ Updated: {path_name} ({n + 1}/{tLen})")
 
             print("✅ Clear live blur completed")
 
         except Exception as e:
             print(f"❌ Error in clear_live_blur: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("clear_live_blur failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -1159,24 +1958,24 @@ class UmaReplace:
 
                 texture_count = 0
                 actual_texture_names = []
-                for obj in env.objects:
-                    if obj.type.name == "Texture2D":
+                # PNG 编码在后台线程进行, 同时继续读取下一个纹理
+                with ThreadPoolExecutor(max_workers=min(6, os.cpu_count() or 1)) as pool:
+                    futures = {}
+                    for obj in _objects_of_type(env, ClassIDType.Texture2D):
                         texture_count += 1
                         try:
+                            texture_name = _peek_object_name(obj)
                             data = obj.read()
-                            if hasattr(data, "m_Name"):
-                                texture_name = data.m_Name
-                                actual_texture_names.append(texture_name)
-                                # 导出纹理为PNG - 不检查名称，全部导出
-                                img_path = f"{export_dir}/{texture_name}.png"
-                                try:
-                                    img = data.image
-                                    img.save(img_path)
-                                    print(f"✅ Exported: {texture_name}")
-                                except Exception as e:
-                                    print(f"❌ Failed to save image {texture_name}: {e}")
+                            actual_texture_names.append(texture_name)
+                            # 导出纹理为PNG - 不检查名称，全部导出
+                            img_path = f"{export_dir}/{texture_name}.png"
+                            try:
+                                futures[pool.submit(_save_png, data.image, img_path)] = texture_name
+                            except Exception as e:
+                                print(f"❌ Failed to save image {texture_name}: {e}")
                         except Exception as e:
                             print(f"❌ Error reading texture object: {e}")
+                    _wait_png_saves(futures)
 
                 print(f"Total Texture2D objects found: {texture_count}")
                 print(f"Actual texture names: {actual_texture_names}")
@@ -1185,8 +1984,7 @@ class UmaReplace:
                 print(f"⚠️  {e}")
             except Exception as e:
                 print(f"⚠️  Error exporting texture: {e}")
-                import traceback
-                traceback.print_exc()
+                log.debug("save_char_body_texture failed", exc_info=True)
             finally:
                 # 清理临时目录
                 self._cleanup_temp_dirs()
@@ -1213,7 +2011,7 @@ class UmaReplace:
 
             # 获取身体材质路径（使用完整的char_id，包括后缀）
             mtl_path = assets_path.get_body_mtl_path(char_id)
-            mtl_names = assets_path.get_body_mtl_names(char_id)
+            mtl_names = frozenset(assets_path.get_body_mtl_names(char_id))
 
             try:
                 bundle_hash = self.get_bundle_hash(mtl_path, char_id)
@@ -1232,23 +2030,26 @@ class UmaReplace:
                 env = UnityPy.load(decrypted_path)
 
                 textures_updated = 0
-                for obj in env.objects:
-                    if obj.type.name == "Texture2D":
-                        data = obj.read()
-                        if hasattr(data, "m_Name") and data.m_Name in mtl_names:
-                            texture_name = data.m_Name
-                            file_path = f"{export_dir}/{texture_name}.png"
-
-                            if os.path.isfile(file_path):
-                                try:
-                                    # 加载修改后的纹理
-                                    image = Image.open(file_path)
-                                    data.image = image
-                                    data.save()
-                                    textures_updated += 1
-                                    print(f"✅ Updated texture: {texture_name}")
-                                except Exception as e:
-                                    print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
+                # 只替换目标纹理中已有 PNG 的部分
+                available = _available_pngs(export_dir)
+                targets = {os.path.normcase(name) for name in mtl_names} & available.keys()
+                for obj in _objects_of_type(env, ClassIDType.Texture2D):
+                    # 先只读名字, 非目标纹理不做完整解码
+                    texture_name = _peek_object_name(obj)
+                    key = os.path.normcase(texture_name or "")
+                    if key not in targets:
+                        continue
+                    file_path = available[key]
+
+                    data = obj.read()
+                    try:
+                        # 加载修改后的纹理
+                        _set_texture_png(data, file_path)
+                        data.save()
+                        textures_updated += 1
+                        print(f"✅ Updated texture: {texture_name}")
+                    except Exception as e:
+                        print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
 
                 if textures_updated == 0:
                     print("⚠️  No textures were updated")
@@ -1256,10 +2057,7 @@ class UmaReplace:
                     print(f"✅ Total textures updated: {textures_updated}")
 
                 edited_file = f"{EDITED_PATH}/{bundle_hash}"
-                os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-                with open(edited_file, "wb") as f:
-                    f.write(env.file.save())
+                _save_env_file(env, edited_file)
 
                 # 加密修改后的文件
                 encrypted_paths = self._encrypt_dat_bundles_batch([edited_file], [bundle_hash])
@@ -1268,9 +2066,9 @@ class UmaReplace:
                     print("❌ Failed to encrypt textures")
                     return
 
-                # 复制加密后的文件回游戏目录
-                print(f"Copying texture bundle back to game directory...")
-                shutil.copyfile(encrypted_paths[0], self.get_bundle_path(bundle_hash))
+                # 将加密后的文件移动回游戏目录
+                print(f"Moving texture bundle back to game directory...")
+                self._install_bundle(encrypted_paths[0], self.get_bundle_path(bundle_hash))
                 print(f"✅ Updated bundle: {bundle_hash}")
 
                 print(f"✅ Body texture replacement completed: {char_id}")
@@ -1280,8 +2078,7 @@ class UmaReplace:
 
         except Exception as e:
             print(f"❌ Error in replace_char_body_texture: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("replace_char_body_texture failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -1321,18 +2118,21 @@ class UmaReplace:
                 try:
                     bundle_hash = self.get_bundle_hash(mtl_path, char_id)
                     bundle_hashes.append((bundle_hash, mtl_path))
-                    # 备份原始文件
-                    self.file_backup(bundle_hash)
                 except UmaFileNotFoundError as e:
                     print(f"⚠️  {e}")
 
+            # 备份原始文件
+            failed = self.file_backup_batch([h for h, _ in bundle_hashes])
+            # 没有备份的文件不做修改
+            bundle_hashes = [item for item in bundle_hashes if item[0] not in failed]
+
             if not bundle_hashes:
                 print("❌ No texture bundles found")
                 yield (True, export_dir)
                 return
 
-            # 解密所有头部纹理文件
-            hashes_only = [h for h, _ in bundle_hashes]
+            # 解密所有头部纹理文件 (多个材质可能位于同一个 bundle, 去重后只处理一次)
+            hashes_only = list(dict.fromkeys(h for h, _ in bundle_hashes))
             decrypted_paths = self._decrypt_dat_bundles_batch(hashes_only)
 
             if not decrypted_paths:
@@ -1340,22 +2140,9 @@ class UmaReplace:
                 yield (True, export_dir)
                 return
 
-            # 从解密后的文件加载并提取纹理
-            for i, decrypted_path in enumerate(decrypted_paths):
-                try:
-                    env = UnityPy.load(decrypted_path)
-                    for obj in env.objects:
-                        if obj.type.name == "Texture2D":
-                            data = obj.read()
-                            if hasattr(data, "m_Name"):
-                                texture_name = data.m_Name
-                                # 导出纹理为PNG
-                                img_path = f"{export_dir}/{texture_name}.png"
-                                img = data.image
-                                img.save(img_path)
-                                print(f"✅ Exported: {texture_name}")
-                except Exception as e:
-                    print(f"⚠️  Error processing bundle {i}: {e}")
+            # 从解密后的文件加载并提取纹理, 各 bundle 互不依赖, 并行处理
+            with ThreadPoolExecutor(max_workers=min(8, len(decrypted_paths))) as executor:
+                list(executor.map(_export_head_bundle_worker, decrypted_paths, itertools.repeat(export_dir)))
 
             print(f"✅ Head textures exported to: {export_dir}")
             yield (True, export_dir)
@@ -1397,87 +2184,29 @@ class UmaReplace:
                 print("❌ No texture bundles found")
                 return
 
-            # 解密所有纹理文件
-            bundle_hashes = [bundle_hash for bundle_hash, _ in bundle_info]
-            decrypted_paths = self._decrypt_dat_bundles_batch(bundle_hashes)
-
-            if not decrypted_paths:
-                print("❌ Failed to decrypt textures")
-                return
-
-            # 处理每个纹理文件
-            print(f"Replacing textures in {len(decrypted_paths)} bundles...")
-            edited_files = []
-            valid_bundle_indices = []  # 记录哪些bundle处理成功
-            for i, decrypted_path in enumerate(decrypted_paths):
-                try:
-                    env = UnityPy.load(decrypted_path)
-                    textures_updated = 0
-
-                    for obj in env.objects:
-                        if obj.type.name == "Texture2D":
-                            data = obj.read()
-                            if hasattr(data, "m_Name"):
-                                texture_name = data.m_Name
-                                file_path = f"{export_dir}/{texture_name}.png"
-
-                                if os.path.isfile(file_path):
-                                    try:
-                                        # 加载修改后的纹理
-                                        image = Image.open(file_path)
-                                        data.image = image
-                                        data.save()
-                                        textures_updated += 1
-                                        print(f"✅ Updated texture: {texture_name}")
-                                    except Exception as e:
-                                        print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
-
-                    if textures_updated == 0:
-                        print(f"⚠️  No textures updated in bundle {i}")
-
-                    bundle_hash = bundle_info[i][0]
-                    edited_file = f"{EDITED_PATH}/{bundle_hash}"
-                    os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-                    with open(edited_file, "wb") as f:
-                        f.write(env.file.save())
-
-                    edited_files.append(edited_file)
-                    valid_bundle_indices.append(i)
+            # 多个材质可能位于同一个 bundle, 去重后只处理一次
+            bundle_hashes = list(dict.fromkeys(bundle_hash for bundle_hash, _ in bundle_info))
 
-                except Exception as e:
-                    print(f"⚠️  Error processing texture bundle {i}: {type(e).__name__}: {e}")
-                    continue
+            # 解密、替换纹理、加密并放回游戏目录按块流水线执行, 各 bundle 的替换在线程中并行
+            print(f"Replacing textures in {len(bundle_hashes)} bundles...")
+            installed = self._pipeline_process(
+                bundle_hashes,
+                functools.partial(_replace_head_bundle_worker, export_dir=export_dir, edited_root=EDITED_PATH,
+                                  available=_available_pngs(export_dir)),
+                executor_cls=ThreadPoolExecutor)
 
-            if not edited_files:
+            if not installed:
                 print("❌ No texture bundles were successfully processed")
                 return
 
-            # 批量加密所有修改后的文件（只加密成功处理的文件）
-            valid_bundle_hashes = [bundle_hashes[i] for i in valid_bundle_indices]
-            encrypted_paths = self._encrypt_dat_bundles_batch(edited_files, valid_bundle_hashes)
-
-            if not encrypted_paths:
-                print("❌ Failed to encrypt textures")
-                return
-
-            # 复制加密后的文件回游戏目录
-            print(f"Copying {len(encrypted_paths)} texture bundles back to game directory...")
-            for i, encrypted_path in enumerate(encrypted_paths):
-                original_bundle_index = valid_bundle_indices[i]
-                bundle_hash, _ = bundle_info[original_bundle_index]
-                try:
-                    shutil.copyfile(encrypted_path, self.get_bundle_path(bundle_hash))
-                    print(f"✅ Updated bundle: {bundle_hash}")
-                except Exception as e:
-                    print(f"⚠️  Failed to copy bundle back: {type(e).__name__}: {e}")
+            for bundle_hash in installed:
+                print(f"✅ Updated bundle: {bundle_hash}")
 
             print(f"✅ Head texture replacement completed: {char_id}")
 
         except Exception as e:
             print(f"❌ Error in replace_char_head_texture: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("replace_char_head_texture failed", exc_info=True)
         finally:
             # 清理临时目录
             self._cleanup_temp_dirs()
@@ -1523,24 +2252,23 @@ class UmaReplace:
             env = UnityPy.load(decrypted_path)
 
             texture_count = 0
-            for obj in env.objects:
-                if obj.type.name == "Texture2D":
-                    try:
+            for obj in _objects_of_type(env, ClassIDType.Texture2D):
+                try:
+                    # 先只读名字, 不需要导出的纹理不做完整解码
+                    texture_name = _peek_object_name(obj)
+                    # 如果指定了纹理名称列表，只导出匹配的纹理；否则导出所有纹理
+                    if not texture_names or texture_name in texture_names:
                         data = obj.read()
-                        if hasattr(data, "m_Name"):
-                            texture_name = data.m_Name
-                            # 如果指定了纹理名称列表，只导出匹配的纹理；否则导出所有纹理
-                            if not texture_names or texture_name in texture_names:
-                                img_path = f"{export_dir}/{texture_name}.png"
-                                try:
-                                    img = data.image
-                                    img.save(img_path)
-                                    texture_count += 1
-                                    print(f"✅ Exported: {texture_name}")
-                                except Exception as e:
-                                    print(f"❌ Failed to save image {texture_name}: {e}")
-                    except Exception as e:
-                        print(f"❌ Error reading texture object: {e}")
+                        img_path = f"{export_dir}/{texture_name}.png"
+                        try:
+                            img = data.image
+                            img.save(img_path)
+                            texture_count += 1
+                            print(f"✅ Exported: {texture_name}")
+                        except Exception as e:
+                            print(f"❌ Failed to save image {texture_name}: {e}")
+                except Exception as e:
+                    print(f"❌ Error reading texture object: {e}")
 
             print(f"Total textures exported: {texture_count}")
             print(f"✅ Textures exported to: {export_dir}")
@@ -1577,26 +2305,49 @@ class UmaReplace:
 
             # 加载并替换纹理
             print(f"Replacing textures in bundle {bundle_hash}...")
+            # 每个 bundle 使用独立的 Environment: UnityPy 的类型树按 SerializedFile 解析, 共用 Environment 不会复用解析结果,
+            # 反而会让已处理的 bundle 一直留在内存中, 并使 env.objects 遍历到其它 bundle 的对象
             env = UnityPy.load(decrypted_path)
 
             textures_updated = 0
-            for obj in env.objects:
-                if obj.type.name == "Texture2D":
-                    data = obj.read()
-                    if hasattr(data, "m_Name"):
-                        texture_name = data.m_Name
-                        file_path = f"{export_dir}/{texture_name}.png"
+            # 先扫描一次目录, 再只读名字, 没有对应 PNG 的纹理不做完整解码
+            overrides = _available_pngs(export_dir)
+            targets = []
+            for obj in _objects_of_type(env, ClassIDType.Texture2D):
+                texture_name = _peek_object_name(obj)
+                file_path = overrides.get(os.path.normcase(texture_name or ""))
+                if file_path is not None:
+                    targets.append((obj, texture_name, file_path))
+
+            with ThreadPoolExecutor(max_workers=2) as decoder, \
+                    ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+                # 后台线程先开始解码 PNG, 与下面读取纹理对象重叠
+                decoded = _submit_png_decodes(decoder, [file_path for _, _, file_path in targets])
+
+                def apply_png(data, file_path: str):
+                    _set_texture_png(data, file_path, decoded[file_path].result())
+
+                # 读取对象需要共用 bundle 的读取位置, 在当前线程中依次完成
+                loaded = []
+                for obj, texture_name, file_path in targets:
+                    try:
+                        loaded.append((obj.read(), texture_name, file_path))
+                    except Exception as e:
+                        print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
 
-                        if os.path.isfile(file_path):
-                            try:
-                                # 加载修改后的纹理
-                                image = Image.open(file_path)
-                                data.image = image
-                                data.save()
-                                textures_updated += 1
-                                print(f"✅ Updated texture: {texture_name}")
-                            except Exception as e:
-                                print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
+                # 纹理编码 (UnityPy 的 C 扩展) 互不依赖, 在线程池中按纹理并行, 写回 bundle 仍在当前线程
+                futures = {executor.submit(apply_png, data, file_path): (data, texture_name)
+                           for data, texture_name, file_path in loaded}
+                for future in as_completed(futures):
+                    data, texture_name = futures[future]
+                    try:
+                        # 加载修改后的纹理
+                        future.result()
+                        data.save()
+                        textures_updated += 1
+                        log.debug("Updated texture: %s", texture_name)
+                    except Exception as e:
+                        print(f"❌ Failed to update texture {texture_name}: {type(e).__name__}: {e}")
 
             if textures_updated == 0:
                 print("⚠️  No textures were updated")
@@ -1605,19 +2356,48 @@ class UmaReplace:
 
             # 保存修改后的文件（未加密）
             edited_file = f"{EDITED_PATH}/{bundle_hash}"
-            os.makedirs(os.path.dirname(edited_file), exist_ok=True)
-
-            with open(edited_file, "wb") as f:
-                f.write(env.file.save())
+            if textures_updated == 0:
+                # 没有修改时无需重新序列化, 直接复制解密后的文件
+                # (不使用硬链接: 之后写入 edited 文件会截断解密缓存中的同一文件)
+                _fastcopy(decrypted_path, edited_file)
+            else:
+                _save_env_file(env, edited_file)
 
             print(f"✅ Texture replacement completed for bundle: {bundle_hash}")
             return edited_file
 
         except Exception as e:
             print(f"❌ Error in replace_texture2d: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            log.debug("replace_texture2d failed", exc_info=True)
             return None
         finally:
-            # 清理临时目录
-            self._cleanup_temp_dirs()
+            # 清理临时目录, 删除在后台进行, 不阻塞返回
+            self._cleanup_temp_dirs(background=True)
+
+
+class ReplaceSession:
+    """
+    批量替换会话, 由 UmaReplace.session() 创建
+    会话期间排队的替换任务在退出时只调用一次解密与一次加密
+    """
+
+    def __init__(self, uma: UmaReplace):
+        self.uma = uma
+        # {orig_hash: (orig_hash, new_hash, orig_path, new_path, id_orig, id_new)}
+        self.jobs = {}
+
+    def __enter__(self) -> "ReplaceSession":
+        if self.uma._session is not None:
+            raise RuntimeError("A replace session is already active")
+        self.uma._session = self
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.uma._session = None
+        try:
+            if exc_type is None and self.jobs:
+                if self.uma._run_replace_jobs(list(self.jobs.values())):
+                    print(f"✅ Session replacement completed: {len(self.jobs)} bundles")
+        finally:
+            self.jobs = {}
+            self.uma._cleanup_temp_dirs()